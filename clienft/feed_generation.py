@@ -1,22 +1,28 @@
 from lxml import etree
 from datetime import datetime
 from log import log_step
+from common.feed_fragments import render_fragments
+from common.feed_writer import write_feed
 from bs4 import BeautifulSoup
 import re
 import mimetypes
 import os
-import requests
 
 # Ensure feed.xml is written in the current folder
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FEED_FILE = os.path.join(BASE_DIR, "feed.xml")
+NSMAP = {
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "content": "http://purl.org/rss/1.0/modules/content/",
+    "wp": "http://wordpress.org/export/1.2/"
+}
+# Bump when render_item() output changes; cached <item> fragments are keyed
+# on it.
+RENDER_VERSION = 1
+RENDERER = f"{os.path.basename(BASE_DIR)}:{RENDER_VERSION}"
 
 def generate_rss_feed(items, output_file=FEED_FILE):
-    rss = etree.Element("rss", version="2.0", nsmap={
-        "dc": "http://purl.org/dc/elements/1.1/",
-        "content": "http://purl.org/rss/1.0/modules/content/",
-        "wp": "http://wordpress.org/export/1.2/"
-    })
+    rss = etree.Element("rss", version="2.0", nsmap=NSMAP)
     channel = etree.SubElement(rss, "channel")
 
     etree.SubElement(channel, "title").text = "clien RSS Feed"
@@ -25,141 +31,124 @@ def generate_rss_feed(items, output_file=FEED_FILE):
     # Convert 09:54 AM +06 (May 21, 2025) to UTC: 03:54 AM GMT
     etree.SubElement(channel, "lastBuildDate").text = "Wed, 21 May 2025 03:54:00 GMT"
 
-    seen_guids = set()
-
-    for idx, item in enumerate(items):
-        if not isinstance(item, dict):
-            log_step(f"Skipping invalid item at index {idx}: {item}")
-            continue
-
-        item_elem = etree.SubElement(channel, "item")
-
-        # Determine item type
-        item_type = item.get('type', 'article')
-
-        if item_type == 'article':
-            # Handle article items
-            title = (item.get('title') or '').strip() or f"Untitled Post {idx + 1}"
-            link = (item.get('link') or '').strip() or f"https://clien.net/placeholder/{idx + 1}"
-            content = (item.get('content') or '').strip()
-            featured_image = (item.get('featured_image') or '').strip()
-            categories = item.get('categories', [])
-        else:
-            # Handle video items
-            title = f"Video Item {idx + 1}" if not item.get('title') else item.get('title').strip()
-            link = item.get('src') or f"https://clien.net/video/{idx + 1}"
-            # Construct video tag with all specified attributes, ensuring __idm_id__ and id="player"
-            video_attrs = {
-                'src': item.get('src', ''),
-                'poster': item.get('poster', ''),
-                'data-file-srl': item.get('data-file-srl', ''),
-                '__idm_id__': item.get('__idm_id__', ''),  # Explicitly include __idm_id__, even if blank
-                'id': 'player',  # Force id="player" for all videos
-                'playsinline': item.get('playsinline', ''),
-                'controls': item.get('controls', ''),
-                'autoplay': item.get('autoplay', ''),
-                'loop': item.get('loop', ''),
-                'muted': item.get('muted', ''),
-                'preload': item.get('preload', ''),
-                'width': item.get('width', ''),
-                'height': item.get('height', '')
-            }
-            # Filter out empty attributes except __idm_id__ and id
-            content = f"<video {' '.join(f'{k}=\"{v}\"' for k, v in video_attrs.items() if v or k in ['__idm_id__', 'id'])}></video>"
-            featured_image = item.get('poster', '')
-            categories = item.get('categories', [])
-
-        guid = link
-        if guid in seen_guids:
-            guid = f"{link}-{idx}"
-            log_step(f"Duplicate GUID detected for link {link}, using {guid}")
-        seen_guids.add(guid)
-
-        log_step(f"Raw content for item {idx + 1}: {content[:500]}{'...' if len(content) > 500 else ''}")
-        log_step(f"Featured image for item {idx + 1}: {featured_image}")
-        log_step(f"Categories for item {idx + 1}: {categories}")
-        if item_type == 'video':
-            log_step(f"Video attributes for item {idx + 1}: {video_attrs}")
-
-        modified_content = modify_content(content)
-
-        soup = BeautifulSoup(modified_content, 'html.parser')
-        plain_text = soup.get_text(strip=True)[:200]
-
-        video_tags = soup.find_all('video')
-        for video in video_tags:
-            src = video.get('src', '')
-            if src:
-                try:
-                    response = requests.head(src, timeout=5)
-                    log_step(f"Video URL {src} status: {response.status_code}, Content-Type: {response.headers.get('Content-Type')}")
-                    if response.status_code != 200 or 'video/' not in response.headers.get('Content-Type', ''):
-                        log_step(f"Warning: Video URL {src} may not be accessible or is not a video")
-                except Exception as e:
-                    log_step(f"Error validating video URL {src}: {str(e)}")
-
-        log_step(f"Video tags for item {idx + 1}: {[str(v) for v in video_tags]}")
-
-        log_step(
-            f"==============\n"
-            f"Item {idx + 1} ({item_type}):\n"
-            f"title: {title}\n"
-            f"link: {link}\n"
-            f"guid: {guid}\n"
-            f"content: {modified_content[:500]}{'...' if len(modified_content) > 500 else ''}\n"
-            f"length: {len(modified_content)}\n"
-            f"plain_text: {plain_text}\n"
-            f"featured_image: {featured_image}\n"
-            f"categories: {categories}\n"
-            f"=============="
-        )
-
-        etree.SubElement(item_elem, "title").text = title
-        etree.SubElement(item_elem, "link").text = link
-
-        for category in categories:
-            etree.SubElement(item_elem, "category").text = category
-        etree.SubElement(item_elem, "{http://purl.org/dc/elements/1.1/}creator").text = "슈파슈파"
-        etree.SubElement(item_elem, "guid", isPermaLink="true").text = guid
-
-        description_elem = etree.SubElement(item_elem, "description")
-        description_elem.text = plain_text or ""
-
-        content_elem = etree.SubElement(item_elem, "{http://purl.org/rss/1.0/modules/content/}encoded")
-        content_elem.text = etree.CDATA(modified_content) if modified_content else ""
-
-        if featured_image and featured_image.startswith('http'):
-            mime_type, _ = mimetypes.guess_type(featured_image)
-            if not mime_type:
-                mime_type = 'image/jpeg'
-            etree.SubElement(item_elem, "enclosure", url=featured_image, type=mime_type, length="0")
-            postmeta_elem = etree.SubElement(item_elem, "{http://wordpress.org/export/1.2/}postmeta")
-            etree.SubElement(postmeta_elem, "meta_key").text = "_thumbnail_id"
-            etree.SubElement(postmeta_elem, "meta_value").text = featured_image
-
-        # Handle video-specific attributes
-        if item_type == 'video':
-            # Add video src as an enclosure
-            if item.get('src'):
-                mime_type, _ = mimetypes.guess_type(item['src'])
-                if not mime_type:
-                    mime_type = 'video/mp4'  # Default for videos
-                etree.SubElement(item_elem, "enclosure", url=item['src'], type=mime_type, length="0")
-
-            # Add video attributes as WordPress metadata, ensuring __idm_id__ and id="player"
-            for attr in ['data-file-srl', '__idm_id__', 'id', 'playsinline', 'controls', 'autoplay', 'loop', 'muted', 'preload', 'width', 'height']:
-                if attr in item or attr in ['__idm_id__', 'id']:  # Include __idm_id__ and id even if blank
-                    postmeta_elem = etree.SubElement(item_elem, "{http://wordpress.org/export/1.2/}postmeta")
-                    etree.SubElement(postmeta_elem, "meta_key").text = f"video_{attr}"
-                    etree.SubElement(postmeta_elem, "meta_value").text = 'player' if attr == 'id' else item.get(attr, '')
-
     try:
-        tree = etree.ElementTree(rss)
-        tree.write(output_file, encoding="utf-8", xml_declaration=True, pretty_print=True)
-        log_step(f"RSS feed written to {output_file}, total items: {len(items)}")
+        total = write_feed(rss, render_fragments(items, render_item, RENDERER), output_file)
+        log_step(f"RSS feed written to {output_file}, total items: {total}")
     except Exception as e:
         log_step(f"Failed to write RSS feed: {str(e)}")
 
+def render_item(idx, item):
+    # Builds one post's <item>. render_fragments() caches the serialized
+    # result and makes GUIDs unique across the feed.
+    item_elem = etree.Element("item", nsmap=NSMAP)
+
+    # Determine item type
+    item_type = item.get('type', 'article')
+
+    if item_type == 'article':
+        # Handle article items
+        title = (item.get('title') or '').strip() or f"Untitled Post {idx + 1}"
+        link = (item.get('link') or '').strip() or f"https://clien.net/placeholder/{idx + 1}"
+        content = (item.get('content') or '').strip()
+        featured_image = (item.get('featured_image') or '').strip()
+        categories = item.get('categories', [])
+    else:
+        # Handle video items
+        title = f"Video Item {idx + 1}" if not item.get('title') else item.get('title').strip()
+        link = item.get('src') or f"https://clien.net/video/{idx + 1}"
+        # Construct video tag with all specified attributes, ensuring __idm_id__ and id="player"
+        video_attrs = {
+            'src': item.get('src', ''),
+            'poster': item.get('poster', ''),
+            'data-file-srl': item.get('data-file-srl', ''),
+            '__idm_id__': item.get('__idm_id__', ''),  # Explicitly include __idm_id__, even if blank
+            'id': 'player',  # Force id="player" for all videos
+            'playsinline': item.get('playsinline', ''),
+            'controls': item.get('controls', ''),
+            'autoplay': item.get('autoplay', ''),
+            'loop': item.get('loop', ''),
+            'muted': item.get('muted', ''),
+            'preload': item.get('preload', ''),
+            'width': item.get('width', ''),
+            'height': item.get('height', '')
+        }
+        # Filter out empty attributes except __idm_id__ and id
+        content = f"<video {' '.join(f'{k}=\"{v}\"' for k, v in video_attrs.items() if v or k in ['__idm_id__', 'id'])}></video>"
+        featured_image = item.get('poster', '')
+        categories = item.get('categories', [])
+
+    guid = link
+
+    log_step(f"Raw content for item {idx + 1}: {content[:500]}{'...' if len(content) > 500 else ''}")
+    log_step(f"Featured image for item {idx + 1}: {featured_image}")
+    log_step(f"Categories for item {idx + 1}: {categories}")
+    if item_type == 'video':
+        log_step(f"Video attributes for item {idx + 1}: {video_attrs}")
+
+    modified_content = modify_content(content)
+
+    soup = BeautifulSoup(modified_content, 'html.parser')
+    plain_text = soup.get_text(strip=True)[:200]
+
+    video_tags = soup.find_all('video')
+
+    log_step(f"Video tags for item {idx + 1}: {[str(v) for v in video_tags]}")
+
+    log_step(
+        f"==============\n"
+        f"Item {idx + 1} ({item_type}):\n"
+        f"title: {title}\n"
+        f"link: {link}\n"
+        f"guid: {guid}\n"
+        f"content: {modified_content[:500]}{'...' if len(modified_content) > 500 else ''}\n"
+        f"length: {len(modified_content)}\n"
+        f"plain_text: {plain_text}\n"
+        f"featured_image: {featured_image}\n"
+        f"categories: {categories}\n"
+        f"=============="
+    )
+
+    etree.SubElement(item_elem, "title").text = title
+    etree.SubElement(item_elem, "link").text = link
+
+    for category in categories:
+        etree.SubElement(item_elem, "category").text = category
+    etree.SubElement(item_elem, "{http://purl.org/dc/elements/1.1/}creator").text = "슈파슈파"
+    etree.SubElement(item_elem, "guid", isPermaLink="true").text = guid
+
+    description_elem = etree.SubElement(item_elem, "description")
+    description_elem.text = plain_text or ""
+
+    content_elem = etree.SubElement(item_elem, "{http://purl.org/rss/1.0/modules/content/}encoded")
+    content_elem.text = etree.CDATA(modified_content) if modified_content else ""
+
+    if featured_image and featured_image.startswith('http'):
+        mime_type, _ = mimetypes.guess_type(featured_image)
+        if not mime_type:
+            mime_type = 'image/jpeg'
+        etree.SubElement(item_elem, "enclosure", url=featured_image, type=mime_type, length=str(item.get('featured_image_length') or 0))
+        postmeta_elem = etree.SubElement(item_elem, "{http://wordpress.org/export/1.2/}postmeta")
+        etree.SubElement(postmeta_elem, "meta_key").text = "_thumbnail_id"
+        etree.SubElement(postmeta_elem, "meta_value").text = featured_image
+
+    # Handle video-specific attributes
+    if item_type == 'video':
+        # Add video src as an enclosure
+        if item.get('src'):
+            mime_type, _ = mimetypes.guess_type(item['src'])
+            if not mime_type:
+                mime_type = 'video/mp4'  # Default for videos
+            etree.SubElement(item_elem, "enclosure", url=item['src'], type=mime_type, length="0")
+
+        # Add video attributes as WordPress metadata, ensuring __idm_id__ and id="player"
+        for attr in ['data-file-srl', '__idm_id__', 'id', 'playsinline', 'controls', 'autoplay', 'loop', 'muted', 'preload', 'width', 'height']:
+            if attr in item or attr in ['__idm_id__', 'id']:  # Include __idm_id__ and id even if blank
+                postmeta_elem = etree.SubElement(item_elem, "{http://wordpress.org/export/1.2/}postmeta")
+                etree.SubElement(postmeta_elem, "meta_key").text = f"video_{attr}"
+                etree.SubElement(postmeta_elem, "meta_value").text = 'player' if attr == 'id' else item.get(attr, '')
+
+    return item_elem
+
 def modify_content(content):
     soup = BeautifulSoup(content, 'html.parser')
     modified_elements = []
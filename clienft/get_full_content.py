@@ -1,85 +1,78 @@
 from bs4 import BeautifulSoup, Comment
 from log import log_step
-from playwright.sync_api import sync_playwright
-import requests
+from common.content_loader import load_post_content_async
 
-def get_full_content(post_url, headers):
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(extra_http_headers=headers)
-            page = context.new_page()
+CONTENT_SELECTOR = '.post_content'
 
-            page.goto(post_url, timeout=10000)
-            page.wait_for_selector('.post_content', timeout=5000)
-            html = page.content()
-            browser.close()
+# Same cleanup as extract_content(), run inside the page when
+# RSSFEED_EXTRACTION_MODE=browser.
+BROWSER_EXTRACT = {
+    'asset_host': 'https://edgio.clien.net',
+    'asset_prefix': 'F01',
+}
 
-        soup = BeautifulSoup(html, 'lxml')
-        content_root = soup.find('div', class_='post_content')
-        if not content_root:
-            log_step(f"No .post_content found at {post_url}")
-            return '', ''
+async def get_full_content_async(post_url, headers):
+    try:
+        return await load_post_content_async(post_url, headers, CONTENT_SELECTOR, extract_content, BROWSER_EXTRACT)
+    except Exception as e:
+        log_step(f"Error fetching content from {post_url}: {str(e)}")
+        return '', '', []
 
-        # Remove comments
-        for comment in content_root.find_all(string=lambda text: isinstance(text, Comment)):
-            comment.extract()
+def extract_content(html, post_url, headers):
+    soup = BeautifulSoup(html, 'lxml')
+    content_root = soup.find('div', class_='post_content')
+    if not content_root:
+        log_step(f"No .post_content found at {post_url}")
+        return '', '', []
 
-        # Fix URLs in <img> and <video>
-        image_urls = []
-        video_urls = []
-        for tag in content_root.find_all(['img', 'video']):
-            if tag.name == 'img':
-                src = tag.get('src', '')
-                if src and not src.startswith('http'):
-                    src = 'https://edgio.clien.net' + src if src.startswith('F01') else 'https://edgio.clien.netF01' + src
-                tag['src'] = src
-                tag['width'] = '720px'
-                image_urls.append(src)
+    # Remove comments
+    for comment in content_root.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
 
-            if tag.name == 'video':
-                src = tag.get('src', '')
-                poster = tag.get('poster', '')
+    # Fix URLs in <img> and <video>
+    image_urls = []
+    video_urls = []
+    for tag in content_root.find_all(['img', 'video']):
+        if tag.name == 'img':
+            src = tag.get('src', '')
+            if src and not src.startswith('http'):
+                src = 'https://edgio.clien.net' + src if src.startswith('F01') else 'https://edgio.clien.netF01' + src
+            tag['src'] = src
+            tag['width'] = '720px'
+            image_urls.append(src)
 
-                if src and not src.startswith('http'):
-                    src = 'https://edgio.clien.net' + src if src.startswith('F01') else 'https://edgio.clien.netF01' + src
-                if poster and not poster.startswith('http'):
-                    poster = 'https://edgio.clien.net' + poster if poster.startswith('F01') else 'https://edgio.clien.netF01' + poster
+        if tag.name == 'video':
+            src = tag.get('src', '')
+            poster = tag.get('poster', '')
 
-                tag['src'] = src
-                tag['poster'] = poster
-                tag['width'] = '720px'
-                if 'controls' not in tag.attrs:
-                    tag['controls'] = ''
-                video_urls.append(src)
+            if src and not src.startswith('http'):
+                src = 'https://edgio.clien.net' + src if src.startswith('F01') else 'https://edgio.clien.netF01' + src
+            if poster and not poster.startswith('http'):
+                poster = 'https://edgio.clien.net' + poster if poster.startswith('F01') else 'https://edgio.clien.netF01' + poster
 
-        cleaned_html = str(content_root)
+            tag['src'] = src
+            tag['poster'] = poster
+            tag['width'] = '720px'
+            if 'controls' not in tag.attrs:
+                tag['controls'] = ''
+            video_urls.append(src)
 
-        # Pick featured image
-        featured_image = image_urls[0] if image_urls else None
-        if featured_image:
-            try:
-                response = requests.head(featured_image, headers=headers, timeout=5)
-                if response.status_code != 200:
-                    featured_image = None
-            except Exception as e:
-                log_step(f"Failed to verify featured image {featured_image}: {str(e)}")
-                featured_image = None
+    cleaned_html = str(content_root)
 
-        log_step(
-            f"==============\n"
-            f"title: {soup.title.text.strip() if soup.title else 'N/A'}\n"
-            f"link: {post_url}\n"
-            f"content: {cleaned_html[:500]}{'...' if len(cleaned_html) > 500 else ''}\n"
-            f"length: {len(cleaned_html)}\n"
-            f"Featured Image: {featured_image}\n"
-            f"Image URLs: {image_urls}\n"
-            f"Video URLs: {video_urls}\n"
-            f"=============="
-        )
+    # Pick featured image; verify_featured_images() checks it later, for
+    # all posts at once
+    featured_image = image_urls[0] if image_urls else None
 
-        return cleaned_html, featured_image
+    log_step(
+        f"==============\n"
+        f"title: {soup.title.text.strip() if soup.title else 'N/A'}\n"
+        f"link: {post_url}\n"
+        f"content: {cleaned_html[:500]}{'...' if len(cleaned_html) > 500 else ''}\n"
+        f"length: {len(cleaned_html)}\n"
+        f"Featured Image: {featured_image}\n"
+        f"Image URLs: {image_urls}\n"
+        f"Video URLs: {video_urls}\n"
+        f"=============="
+    )
 
-    except Exception as e:
-        log_step(f"Error fetching content from {post_url}: {str(e)}")
-        return '', ''
+    return cleaned_html, featured_image, video_urls
@@ -0,0 +1,76 @@
+# Compare the two ways of extracting a rendered post:
+#   soup     content root outerHTML over the Playwright pipe, then the site's
+#            extract_content() with BeautifulSoup (the default)
+#   browser  EXTRACT_JS runs in the page and returns JSON
+# Each post is loaded once and both extractions then run ROUNDS times on the
+# same page, so network and page load are left out.
+#
+#   python -m common.bench_extraction <site folder> <post url> [<post url> ...]
+import importlib
+import os
+import statistics
+import sys
+import time
+from playwright.sync_api import sync_playwright
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from common.browser_extract import EXTRACT_JS
+from common.browser_pool import CONTENT_ROOT_JS
+from common.content_loader import content_document
+from common.log import bind_log
+
+ROUNDS = 20
+
+def load_site(folder):
+    sys.path.insert(0, os.path.join(ROOT_DIR, folder))
+    site = importlib.import_module("get_full_content")
+    return site
+
+def time_soup(page, site, post_url):
+    start = time.perf_counter()
+    title = page.title()
+    content_html = page.evaluate(CONTENT_ROOT_JS, site.CONTENT_SELECTOR)
+    browser_done = time.perf_counter()
+    site.extract_content(content_document(title, content_html), post_url, {})
+    end = time.perf_counter()
+    return browser_done - start, end - browser_done, len(content_html.encode("utf-8"))
+
+def time_browser(page, site):
+    start = time.perf_counter()
+    result = page.evaluate(EXTRACT_JS, [site.CONTENT_SELECTOR, site.BROWSER_EXTRACT])
+    end = time.perf_counter()
+    size = len(result["html"].encode("utf-8")) if result else 0
+    return end - start, 0.0, size
+
+def report(name, samples):
+    browser_ms = statistics.median(s[0] for s in samples) * 1000
+    python_ms = statistics.median(s[1] for s in samples) * 1000
+    print(f"  {name:<8} browser {browser_ms:8.2f} ms  python {python_ms:8.2f} ms  "
+          f"total {browser_ms + python_ms:8.2f} ms  payload {samples[0][2]:>9} bytes")
+
+def main(folder, post_urls):
+    bind_log(lambda message: None)
+    site = load_site(folder)
+    render_options = getattr(site, "RENDER_OPTIONS", {})
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        for post_url in post_urls:
+            page = browser.new_page()
+            page.goto(post_url, timeout=render_options.get("goto_timeout", 10000),
+                      wait_until=render_options.get("wait_until", "load"))
+            page.wait_for_selector(site.CONTENT_SELECTOR, timeout=render_options.get("selector_timeout", 5000))
+            soup_samples = [time_soup(page, site, post_url) for _ in range(ROUNDS)]
+            browser_samples = [time_browser(page, site) for _ in range(ROUNDS)]
+            print(post_url)
+            report("soup", soup_samples)
+            report("browser", browser_samples)
+            page.close()
+        browser.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: python -m common.bench_extraction <site folder> <post url> [<post url> ...]")
+        sys.exit(1)
+    main(sys.argv[1], sys.argv[2:])
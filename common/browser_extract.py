@@ -0,0 +1,90 @@
+import os
+from urllib.parse import urlparse
+from common.browser_pool import async_browser_page, wait_for_content
+from common.host_limiter import async_host_slot
+from common.log import log_step
+
+# RSSFEED_EXTRACTION_MODE=browser runs the post cleanup inside the page and
+# returns JSON, so Python never builds a soup for browser-rendered posts.
+# Static-fetch hits still go through the site's extract_content().
+EXTRACTION_MODE = os.environ.get("RSSFEED_EXTRACTION_MODE", "soup").strip().lower()
+
+# Mirrors the bs4 cleanup in the sites' extract_content(). Site config keys:
+#   asset_host, asset_prefix   rewrite for relative img/video src and poster
+#   remove_selectors           CSS selectors dropped from the content root
+#   remove_headings            [tag, text] pairs: drop headings containing text
+EXTRACT_JS = """([selector, config]) => {
+    const found = document.querySelector('div' + selector) || document.querySelector(selector);
+    if (!found) return null;
+    const root = found.cloneNode(true);
+
+    for (const sel of config.remove_selectors || []) {
+        try { root.querySelectorAll(sel).forEach(el => el.remove()); } catch (e) {}
+    }
+    for (const [tag, text] of config.remove_headings || []) {
+        root.querySelectorAll(tag).forEach(el => { if (el.textContent.includes(text)) el.remove(); });
+    }
+
+    const walker = document.createTreeWalker(root, NodeFilter.SHOW_COMMENT);
+    const comments = [];
+    while (walker.nextNode()) comments.push(walker.currentNode);
+    comments.forEach(comment => comment.remove());
+
+    const host = config.asset_host || '';
+    const prefix = config.asset_prefix || '';
+    const absolute = url => {
+        if (!url || url.startsWith('http')) return url;
+        return url.startsWith(prefix) ? host + url : host + prefix + url;
+    };
+
+    const images = [];
+    const videos = [];
+    root.querySelectorAll('img, video').forEach(el => {
+        const src = absolute(el.getAttribute('src') || '');
+        el.setAttribute('src', src);
+        el.setAttribute('width', '720px');
+        if (el.tagName === 'IMG') {
+            images.push(src);
+            return;
+        }
+        el.setAttribute('poster', absolute(el.getAttribute('poster') || ''));
+        if (!el.hasAttribute('controls')) el.setAttribute('controls', '');
+        videos.push(src);
+    });
+
+    return {html: root.outerHTML, images: images, videos: videos, title: document.title};
+}"""
+
+def browser_extraction_enabled(config):
+    return EXTRACTION_MODE == "browser" and config is not None
+
+async def render_extracted_async(post_url, headers, selector, config, goto_timeout=10000, selector_timeout=5000, wait_until="load", blocked_domains=()):
+    async with async_browser_page(headers, blocked_domains, profile=urlparse(post_url).netloc) as page:
+        async with async_host_slot(post_url) as slot:
+            response = await page.goto(post_url, timeout=goto_timeout, wait_until=wait_until)
+            if response is not None:
+                slot.record(response.status, await response.header_value('retry-after'))
+        await wait_for_content(page, post_url, selector, selector_timeout)
+        return await page.evaluate(EXTRACT_JS, [selector, config])
+
+def finish_extracted(result, post_url, headers):
+    # Same (cleaned_html, featured_image, video_urls) contract as
+    # extract_content().
+    if not result:
+        log_step(f"No content root found at {post_url}")
+        return '', '', []
+    cleaned_html = result['html']
+    # Checked later by verify_featured_images(), like extract_content()'s pick.
+    featured_image = result['images'][0] if result['images'] else None
+    log_step(
+        f"==============\n"
+        f"title: {(result.get('title') or 'N/A').strip()}\n"
+        f"link: {post_url}\n"
+        f"content: {cleaned_html[:500]}{'...' if len(cleaned_html) > 500 else ''}\n"
+        f"length: {len(cleaned_html)}\n"
+        f"Featured Image: {featured_image}\n"
+        f"Image URLs: {result['images']}\n"
+        f"Video URLs: {result['videos']}\n"
+        f"=============="
+    )
+    return cleaned_html, featured_image, result['videos']
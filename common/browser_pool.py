@@ -0,0 +1,268 @@
+import asyncio
+import os
+from urllib.parse import urlparse
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+from common.lifecycle import on_shutdown
+from common.browser_profiles import PROFILE_MODE, storage_state_file, user_data_dir, touch
+from common.host_limiter import async_host_slot
+from common.chromium_procs import owner_args, owned_rss_bytes, reap_orphans
+from common.log import log_step
+from common.request_blocking import RequestBlocker
+from common.retry_policy import SelectorTimeout
+
+# run_all.py starts one Chromium for every site process and exports its CDP
+# endpoint here; a site run on its own launches a private browser instead.
+BROWSER_ENDPOINT_ENV = "RSSFEED_BROWSER_ENDPOINT"
+
+# Long runs leak memory in Chromium. A browser we launched is replaced after
+# MAX_PAGES_PER_BROWSER pages, or once our Chromium processes use more than
+# MAX_BROWSER_RSS_BYTES (checked every RSS_CHECK_EVERY pages). Regular
+# contexts already live for one post; persistent profile contexts are
+# reopened after MAX_PAGES_PER_CONTEXT pages.
+MAX_PAGES_PER_BROWSER = 200
+MAX_PAGES_PER_CONTEXT = 50
+MAX_BROWSER_RSS_BYTES = 1024 * 1024 * 1024
+RSS_CHECK_EVERY = 10
+
+def shared_browser_endpoint():
+    return os.environ.get(BROWSER_ENDPOINT_ENV) or None
+
+class _Leases:
+    # Counts open and served pages per browser or persistent context, so a
+    # retired one is closed only once its last page is done.
+    def __init__(self):
+        self.active = {}
+        self.served = {}
+        self.retired = {}
+
+    def acquire(self, owner):
+        self.active[id(owner)] = self.active.get(id(owner), 0) + 1
+        self.served[id(owner)] = self.served.get(id(owner), 0) + 1
+
+    def release(self, owner):
+        # Returns the owner when it was retired and is now idle: time to close.
+        self.active[id(owner)] -= 1
+        if self.active[id(owner)] == 0 and id(owner) in self.retired:
+            return self._forget(owner)
+        return None
+
+    def retire(self, owner):
+        self.retired[id(owner)] = owner
+        if self.active.get(id(owner), 0) == 0:
+            return self._forget(owner)
+        return None
+
+    def _forget(self, owner):
+        self.active.pop(id(owner), None)
+        self.served.pop(id(owner), None)
+        return self.retired.pop(id(owner), None)
+
+    def pages(self, owner):
+        return self.served.get(id(owner), 0)
+
+    def idle(self, owner):
+        return self.active.get(id(owner), 0) == 0
+
+def _browser_worn_out(pages):
+    if pages >= MAX_PAGES_PER_BROWSER:
+        log_step(f"Recycling Chromium after {pages} pages")
+        return True
+    if pages and pages % RSS_CHECK_EVERY == 0:
+        rss = owned_rss_bytes()
+        if rss > MAX_BROWSER_RSS_BYTES:
+            log_step(f"Recycling Chromium at {rss // (1024 * 1024)} MB RSS after {pages} pages")
+            return True
+    return False
+
+# Serialize only the content root instead of the whole document. Sites look
+# the root up with soup.find('div', class_=...), so prefer a div match.
+CONTENT_ROOT_JS = """selector => {
+    const root = document.querySelector('div' + selector) || document.querySelector(selector);
+    return root ? root.outerHTML : '';
+}"""
+
+class AsyncBrowserPool:
+    # One browser per run, many concurrent contexts on it, for the asyncio
+    # fetch engine.
+    def __init__(self, headless=True):
+        self.headless = headless
+        self._playwright = None
+        self._browser = None
+        self._shared = False
+        self._leases = _Leases()
+        self._launch_lock = asyncio.Lock()
+        self.pages_served = 0
+        self.blocker = RequestBlocker()
+        self._persistent_contexts = {}
+
+    async def _start(self):
+        if self._playwright is None:
+            reap_orphans()
+            self._playwright = await async_playwright().start()
+
+    async def _close_quietly(self, owner):
+        try:
+            await owner.close()
+        except Exception as e:
+            log_step(f"Error closing Chromium: {str(e)}")
+
+    async def _ensure_browser(self):
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                if self._shared or not _browser_worn_out(self._leases.pages(self._browser)):
+                    return self._browser
+                # Pages still open on the old browser finish there; it is
+                # closed when the last of them is released.
+                retired = self._leases.retire(self._browser)
+                if retired is not None:
+                    await self._close_quietly(retired)
+                self._browser = None
+            await self._start()
+            endpoint = shared_browser_endpoint()
+            if endpoint:
+                try:
+                    self._browser = await self._playwright.chromium.connect_over_cdp(endpoint)
+                    self._shared = True
+                    log_step(f"Connected to shared Chromium at {endpoint}")
+                    return self._browser
+                except Exception as e:
+                    log_step(f"Could not connect to shared Chromium at {endpoint}, launching our own: {str(e)}")
+            self._browser = await self._playwright.chromium.launch(headless=self.headless, args=owner_args())
+            self._shared = False
+            log_step("Launched shared Chromium instance (async)")
+            return self._browser
+
+    async def _persistent_context(self, profile, headers):
+        async with self._launch_lock:
+            context = self._persistent_contexts.get(profile)
+            if context is not None:
+                pages = self._leases.pages(context)
+                if pages < MAX_PAGES_PER_CONTEXT or not self._leases.idle(context):
+                    self._leases.acquire(context)
+                    return context
+                log_step(f"Recycling browser profile {profile} after {pages} pages")
+                await self._close_quietly(self._leases.retire(context))
+                del self._persistent_contexts[profile]
+            await self._start()
+            path = user_data_dir(profile)
+            try:
+                context = await self._playwright.chromium.launch_persistent_context(
+                    path, headless=self.headless, extra_http_headers=headers or {}, args=owner_args())
+            except Exception as e:
+                log_step(f"Could not open browser profile {path}, using a fresh context: {str(e)}")
+                return None
+            context.on("response", self.blocker.record_response)
+            touch(path)
+            self._persistent_contexts[profile] = context
+            self._leases.acquire(context)
+            log_step(f"Opened persistent browser profile {path}")
+            return context
+
+    async def _new_context(self, browser, headers, storage_path):
+        if storage_path and os.path.exists(storage_path):
+            try:
+                return await browser.new_context(extra_http_headers=headers or {}, storage_state=storage_path)
+            except Exception as e:
+                log_step(f"Could not load browser storage {storage_path}, using a fresh context: {str(e)}")
+        return await browser.new_context(extra_http_headers=headers or {})
+
+    async def _save_storage_state(self, context, storage_path):
+        # Concurrent posts on one host share the file, and a later context may
+        # load it at any moment, so write beside it and swap.
+        tmp_path = f"{storage_path}.{os.getpid()}.{id(context)}.tmp"
+        try:
+            os.makedirs(os.path.dirname(storage_path), exist_ok=True)
+            await context.storage_state(path=tmp_path)
+            os.replace(tmp_path, storage_path)
+        except Exception as e:
+            log_step(f"Could not save browser storage {storage_path}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @asynccontextmanager
+    async def page(self, headers=None, blocked_domains=(), profile=None):
+        if profile and PROFILE_MODE == "persistent":
+            # _persistent_context() takes the lease under the lock, so a
+            # recycle can never close a context another task just got.
+            context = await self._persistent_context(profile, headers)
+            if context is not None:
+                try:
+                    page = await context.new_page()
+                    self.pages_served += 1
+                    try:
+                        yield page
+                    finally:
+                        await page.close()
+                finally:
+                    self._leases.release(context)
+                return
+
+        browser = await self._ensure_browser()
+        self._leases.acquire(browser)
+        try:
+            storage_path = storage_state_file(profile) if profile and PROFILE_MODE == "storage" else None
+            context = await self._new_context(browser, headers, storage_path)
+            try:
+                await context.route("**/*", self.blocker.async_handler(blocked_domains))
+                context.on("response", self.blocker.record_response)
+                page = await context.new_page()
+                self.pages_served += 1
+                yield page
+                if storage_path:
+                    await self._save_storage_state(context, storage_path)
+            finally:
+                await context.close()
+        finally:
+            retired = self._leases.release(browser)
+            if retired is not None:
+                await self._close_quietly(retired)
+
+    async def close(self):
+        for context in self._persistent_contexts.values():
+            await self._close_quietly(context)
+        self._persistent_contexts = {}
+        for retired in list(self._leases.retired.values()):
+            await self._close_quietly(retired)
+        self._leases = _Leases()
+        if self._browser is not None:
+            await self._close_quietly(self._browser)
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+            log_step(f"Shared Chromium shut down after {self.pages_served} pages")
+            log_step(self.blocker.summary())
+
+_async_pool = None
+
+def get_async_browser_pool():
+    global _async_pool
+    if _async_pool is None:
+        _async_pool = AsyncBrowserPool()
+    return _async_pool
+
+def async_browser_page(headers=None, blocked_domains=(), profile=None):
+    return get_async_browser_pool().page(headers, blocked_domains, profile)
+
+@on_shutdown
+async def close_async_browser_pool():
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+
+async def wait_for_content(page, post_url, selector, selector_timeout):
+    try:
+        await page.wait_for_selector(selector, timeout=selector_timeout)
+    except PlaywrightTimeout as e:
+        raise SelectorTimeout(f"No {selector} at {post_url} after {selector_timeout}ms") from e
+
+async def render_content_async(post_url, headers, selector, goto_timeout=10000, selector_timeout=5000, wait_until="load", blocked_domains=()):
+    async with async_browser_page(headers, blocked_domains, profile=urlparse(post_url).netloc) as page:
+        async with async_host_slot(post_url) as slot:
+            response = await page.goto(post_url, timeout=goto_timeout, wait_until=wait_until)
+            if response is not None:
+                slot.record(response.status, await response.header_value('retry-after'))
+        await wait_for_content(page, post_url, selector, selector_timeout)
+        return await page.title(), await page.evaluate(CONTENT_ROOT_JS, selector)
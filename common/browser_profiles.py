@@ -0,0 +1,86 @@
+import os
+import shutil
+import time
+from common.lifecycle import on_shutdown
+from common.log import log_step
+
+# RSSFEED_BROWSER_PROFILE selects how browser state survives between posts
+# and runs:
+#   ""           fresh, empty context per post (default)
+#   "storage"    per-host cookies/localStorage file loaded into each context
+#   "persistent" per-host Chromium user-data dir, which also keeps the HTTP
+#                disk cache. Request blocking is skipped in this mode because
+#                any route handler turns Chromium's HTTP cache off.
+PROFILE_MODE = os.environ.get("RSSFEED_BROWSER_PROFILE", "").strip().lower()
+
+PROFILE_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".browser_profiles")
+PROFILE_MAX_AGE = 14 * 24 * 3600
+PROFILE_MAX_TOTAL_BYTES = 512 * 1024 * 1024
+
+def _profile_name(profile):
+    return "".join(c if c.isalnum() or c in "-." else "_" for c in profile)
+
+def storage_state_file(profile):
+    return os.path.join(PROFILE_ROOT, "storage", _profile_name(profile) + ".json")
+
+def user_data_dir(profile):
+    return os.path.join(PROFILE_ROOT, "persistent", _profile_name(profile))
+
+def touch(path):
+    # GC ranks profiles by mtime, so mark them used even when Chromium
+    # only read from them.
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def _size_of(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+@on_shutdown
+def gc_profiles(max_age=PROFILE_MAX_AGE, max_total_bytes=PROFILE_MAX_TOTAL_BYTES):
+    # Expire profiles unused for max_age, then drop the least recently used
+    # ones until the whole profile root fits in max_total_bytes.
+    entries = []
+    for kind in ("storage", "persistent"):
+        kind_dir = os.path.join(PROFILE_ROOT, kind)
+        if not os.path.isdir(kind_dir):
+            continue
+        for name in os.listdir(kind_dir):
+            path = os.path.join(kind_dir, name)
+            try:
+                entries.append((os.path.getmtime(path), _size_of(path), path))
+            except OSError:
+                continue
+    if not entries:
+        return
+
+    now = time.time()
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, path in entries:
+        if now - mtime > max_age or total > max_total_bytes:
+            _remove(path)
+            total -= size
+            removed += 1
+    if removed:
+        log_step(f"Removed {removed} browser profiles, {total} bytes left in {PROFILE_ROOT}")
@@ -0,0 +1,89 @@
+import os
+import signal
+from common.log import log_step
+
+# Every Chromium we launch carries this switch with the launching Python
+# process' PID. Chromium ignores unknown switches, and it lets us measure our
+# own browsers' memory and find browsers whose owner died mid-run.
+OWNER_FLAG = "--rssfeed-owner="
+PROC_DIR = "/proc"
+
+def owner_args(owner_pid=None):
+    return [f"{OWNER_FLAG}{owner_pid or os.getpid()}"]
+
+def _read_procs():
+    # pid -> (ppid, rss bytes, owner pid or None). Empty where /proc is
+    # missing, which turns measuring and reaping into no-ops.
+    procs = {}
+    try:
+        pids = [name for name in os.listdir(PROC_DIR) if name.isdigit()]
+    except OSError:
+        return procs
+    for name in pids:
+        try:
+            with open(os.path.join(PROC_DIR, name, "cmdline"), "rb") as f:
+                cmdline = f.read().split(b"\0")
+            with open(os.path.join(PROC_DIR, name, "status"), "r", encoding="utf-8") as f:
+                status = f.read()
+        except OSError:
+            continue
+        ppid, rss = 0, 0
+        for line in status.splitlines():
+            if line.startswith("PPid:"):
+                ppid = int(line.split()[1])
+            elif line.startswith("VmRSS:"):
+                rss = int(line.split()[1]) * 1024
+        owner = None
+        for arg in cmdline:
+            if arg.startswith(OWNER_FLAG.encode()):
+                try:
+                    owner = int(arg[len(OWNER_FLAG):])
+                except ValueError:
+                    pass
+        procs[int(name)] = (ppid, rss, owner)
+    return procs
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def owned_rss_bytes(owner_pid=None):
+    # Browser processes carry the flag; renderers and the GPU process do not,
+    # so walk down from the flagged ones.
+    owner_pid = owner_pid or os.getpid()
+    procs = _read_procs()
+    children = {}
+    for pid, (ppid, _, _) in procs.items():
+        children.setdefault(ppid, []).append(pid)
+    stack = [pid for pid, (_, _, owner) in procs.items() if owner == owner_pid]
+    seen = set()
+    total = 0
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        total += procs[pid][1]
+        stack.extend(children.get(pid, []))
+    return total
+
+def reap_orphans():
+    # Kill browsers left behind by a site process that crashed before it could
+    # close them. Killing the browser process takes its children down with it.
+    reaped = 0
+    for pid, (_, _, owner) in _read_procs().items():
+        if owner is None or owner == os.getpid() or _alive(owner):
+            continue
+        try:
+            os.kill(pid, signal.SIGKILL)
+            reaped += 1
+        except OSError:
+            continue
+    if reaped:
+        log_step(f"Reaped {reaped} orphaned Chromium processes")
+    return reaped
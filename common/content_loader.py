@@ -0,0 +1,77 @@
+import asyncio
+import html as html_lib
+import lxml.html
+from common.browser_extract import browser_extraction_enabled, render_extracted_async, finish_extracted
+from common.browser_pool import render_content_async
+from common.http_client import http_get, decoded_text
+from common.log import log_step
+from common.render_strategy import get_render_strategy
+from common.retry_policy import with_retries_async
+
+STATIC_TIMEOUT = 10
+
+def _class_xpath(selector, tag='*'):
+    # Content selectors are plain class selectors such as '.xe_content'.
+    class_name = selector.lstrip('.')
+    return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+def content_document(title, content_html):
+    # extract_content() only needs the title and the content root, so both the
+    # static and the browser path hand it this small document instead of the
+    # full page.
+    return (f"<html><head><title>{html_lib.escape(title or '')}</title></head>"
+            f"<body>{content_html}</body></html>")
+
+def static_content(html, selector):
+    # Returns (title, content root HTML), or None for a page without
+    # server-rendered content. A JS shell either lacks the root or ships it
+    # empty and fills it in later, so require text or media inside it.
+    try:
+        doc = lxml.html.fromstring(html)
+    except (lxml.etree.ParserError, ValueError):
+        return None
+    roots = doc.xpath(_class_xpath(selector, 'div')) or doc.xpath(_class_xpath(selector))
+    if not roots:
+        return None
+    root = roots[0]
+    if not (root.text_content().strip() or root.xpath('.//img|.//video|.//iframe')):
+        return None
+    title = doc.findtext('.//title') or ''
+    return title.strip(), lxml.html.tostring(root, encoding='unicode')
+
+def fetch_static_html(post_url, headers, selector):
+    try:
+        response = http_get(post_url, headers=headers, timeout=STATIC_TIMEOUT)
+        response.raise_for_status()
+        html = decoded_text(response)
+    except Exception as e:
+        log_step(f"Static fetch failed for {post_url}: {str(e)}")
+        return None
+    content = static_content(html, selector)
+    if content is None:
+        log_step(f"No server-rendered {selector} at {post_url}, falling back to browser")
+        return None
+    log_step(f"Static fetch hit for {post_url}")
+    return content_document(*content)
+
+def _try_static(post_url, headers, selector):
+    # Hosts that learned they need JS skip straight to the browser, apart
+    # from the occasional re-probe.
+    strategy = get_render_strategy()
+    if not strategy.should_try_static(post_url):
+        return None
+    html = fetch_static_html(post_url, headers, selector)
+    strategy.record_static(post_url, html is not None)
+    return html
+
+async def load_post_content_async(post_url, headers, selector, extract, browser_extract=None, **render_options):
+    # Returns extract()'s (cleaned_html, featured_image, video_urls). With
+    # in-browser extraction enabled, rendered posts skip extract() and its
+    # soup.
+    html = await asyncio.to_thread(_try_static, post_url, headers, selector)
+    if html is None and browser_extraction_enabled(browser_extract):
+        result = await with_retries_async(lambda: render_extracted_async(post_url, headers, selector, browser_extract, **render_options), post_url)
+        return await asyncio.to_thread(finish_extracted, result, post_url, headers)
+    if html is None:
+        html = content_document(*await with_retries_async(lambda: render_content_async(post_url, headers, selector, **render_options), post_url))
+    return await asyncio.to_thread(extract, html, post_url, headers)
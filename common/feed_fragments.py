@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+from lxml import etree
+from common.lifecycle import on_shutdown
+from common.log import log_step
+
+# Serialized <item> fragments keyed by a hash of the post and the site's
+# renderer version, so an unchanged post is never rendered twice. Losing the
+# file only costs one full re-render, so it stays out of git.
+FRAGMENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".feed_fragments")
+FRAGMENT_FILE = os.path.join(FRAGMENT_DIR, "fragments.sqlite3")
+# Fragments not used by any feed for this long are pruned.
+FRAGMENT_MAX_AGE = 30 * 24 * 3600
+
+Fragment = namedtuple("Fragment", "guid key body")
+_NS_DECLARATION = re.compile(rb'\s+xmlns(?::[\w.-]+)?="[^"]*"')
+
+class FragmentCache:
+    def __init__(self, path=FRAGMENT_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fragments ("
+            " key TEXT PRIMARY KEY, guid TEXT, body BLOB, last_used REAL)"
+        )
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, count=True):
+        # Returns (guid, body) or None.
+        with self._lock:
+            row = self._db.execute("SELECT guid, body FROM fragments WHERE key = ?", (key,)).fetchone()
+            if count:
+                if row is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            if row is None:
+                return None
+            self._db.execute("UPDATE fragments SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return row[0], zlib.decompress(row[1])
+
+    def put(self, key, guid, body):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO fragments VALUES (?, ?, ?, ?)",
+                (key, guid, zlib.compress(body), time.time()),
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.execute("DELETE FROM fragments WHERE last_used <= ?", (time.time() - FRAGMENT_MAX_AGE,))
+            self._db.commit()
+            self._db.close()
+        log_step(f"Feed fragments: {self.hits} reused, {self.misses} rendered")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_fragment_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FragmentCache()
+        return _cache
+
+@on_shutdown
+def close_fragment_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+
+def fragment_key(renderer, idx, item):
+    # Posts without a title or link get placeholders numbered by position,
+    # so only those depend on idx.
+    payload = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+    placeholder = not (item.get('title') or '').strip() or not (item.get('link') or item.get('src') or '').strip()
+    position = str(idx) if placeholder else ""
+    return hashlib.sha256(f"{renderer}\0{position}\0{payload}".encode("utf-8")).hexdigest()
+
+def serialize_item(item_elem):
+    # Indented for its place under <rss><channel>, as pretty_print did.
+    # lxml declares the namespaces again on a standalone <item>; the feed's
+    # <rss> already declares the site's NSMAP, so they are dropped.
+    etree.indent(item_elem, space="  ", level=2)
+    item_elem.tail = None
+    start, rest = etree.tostring(item_elem, encoding="utf-8").split(b">", 1)
+    return _NS_DECLARATION.sub(b"", start) + b">" + rest
+
+def render_fragments(items, render_item, renderer):
+    # Yields a Fragment per post, rendering with render_item(idx, item) only
+    # when the cache has nothing for this post and renderer. GUIDs are made
+    # unique here rather than in render_item(), so a cached fragment never
+    # depends on the posts around it.
+    cache = get_fragment_cache()
+    seen_guids = set()
+    for idx, item in enumerate(items):
+        if not isinstance(item, dict):
+            log_step(f"Skipping invalid item at index {idx}: {item}")
+            continue
+        key = fragment_key(renderer, idx, item)
+        cached = cache.get(key)
+        if cached is not None and cached[0] not in seen_guids:
+            seen_guids.add(cached[0])
+            yield Fragment(cached[0], key, cached[1])
+            continue
+        item_elem = render_item(idx, item)
+        guid_elem = item_elem.find("guid")
+        guid = guid_elem.text if guid_elem is not None else None
+        if guid in seen_guids:
+            link = guid
+            guid_elem.text = guid = f"{link}-{idx}"
+            log_step(f"Duplicate GUID detected for link {link}, using {guid}")
+            # Only the duplicate is renamed; the cache keeps the plain form.
+            yield Fragment(guid, None, serialize_item(item_elem))
+        else:
+            body = serialize_item(item_elem)
+            cache.put(key, guid, body)
+            yield Fragment(guid, key, body)
+        seen_guids.add(guid)
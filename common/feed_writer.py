@@ -0,0 +1,202 @@
+import asyncio
+import copy
+import os
+import queue
+import threading
+import time
+from lxml import etree
+from common.feed_fragments import get_fragment_cache, serialize_item
+from common.log import log_step
+from common.post_index import canonical_link
+from common.state import STATE_DIR, state_path, load_json, save_json
+
+# RSSFEED_FEED_MODE=full writes only this run's posts, as before. The default
+# rolling mode keeps earlier items from the existing feed.xml, so a run that
+# only fetched a few new posts (see post_index and pagination's early stop)
+# still publishes a full feed.
+FEED_MODE = os.environ.get("RSSFEED_FEED_MODE", "rolling").strip().lower()
+MAX_FEED_ITEMS = 100
+MAX_ITEM_AGE = 14 * 24 * 3600
+# Per feed, the items it holds in order as [guid, fragment key, first seen].
+# Items carry no pubDate to age them by, and the fragment keys let old items
+# be copied from the fragment cache instead of parsed out of feed.xml.
+MANIFEST_FILE = state_path("feed_items.json")
+_manifest_lock = threading.Lock()
+# Posts waiting between a site's scrape loop and its writer thread.
+STREAM_BUFFER = 8
+
+def _feed_key(output_file):
+    return os.path.relpath(os.path.abspath(output_file), os.path.dirname(STATE_DIR))
+
+def _merge_key(guid):
+    # Sites such as clien (po=N) and ilbe (?page=N) put the listing page in
+    # the post link, so the same post comes back under a new GUID once it
+    # moves down a page. Items are matched on the canonical link instead.
+    return canonical_link(guid) if guid else guid
+
+def _load_manifest(all_manifests, key):
+    entries = all_manifests.get(key, [])
+    if isinstance(entries, dict):
+        # Older {guid: first_seen} form: no order or keys, so every old item
+        # comes from feed.xml this once.
+        return [], {_merge_key(guid): first_seen for guid, first_seen in entries.items()}
+    return entries, {_merge_key(guid): first_seen for guid, _, first_seen in entries}
+
+def _parse_previous_items(output_file, wanted):
+    # Streams the existing feed's items whose GUID wanted() accepts, for old
+    # items with no cached fragment. Returns [(guid, body)] in feed order.
+    found = []
+    if not os.path.exists(output_file):
+        return found
+    try:
+        for _, item in etree.iterparse(output_file, events=("end",), tag="item", strip_cdata=False, huge_tree=True):
+            guid = item.findtext("guid")
+            if wanted(guid):
+                found.append((guid, serialize_item(copy.deepcopy(item))))
+            item.clear()
+            while item.getprevious() is not None:
+                del item.getparent()[0]
+    except (OSError, etree.XMLSyntaxError) as e:
+        log_step(f"Could not read previous feed {output_file}, keeping only new items: {str(e)}")
+    return found
+
+def _previous_fragments(output_file, manifest, skip_guids):
+    # Old items in feed order as [guid, key, body], skipping posts this run
+    # rewrote (skip_guids holds merge keys).
+    if not manifest:
+        # First rolling run, or the older manifest form: take the items
+        # straight from feed.xml.
+        return [[guid, None, body] for guid, body in _parse_previous_items(output_file, lambda guid: _merge_key(guid) not in skip_guids)]
+    cache = get_fragment_cache()
+    previous = []
+    for guid, key, _ in manifest:
+        if _merge_key(guid) in skip_guids:
+            continue
+        cached = cache.get(key, count=False) if key else None
+        previous.append([guid, key, cached[1] if cached else None])
+    missing = {guid for guid, _, body in previous if body is None}
+    if missing:
+        parsed = dict(_parse_previous_items(output_file, lambda guid: guid in missing))
+        for entry in previous:
+            if entry[2] is None:
+                entry[2] = parsed.get(entry[0])
+    return [entry for entry in previous if entry[2] is not None]
+
+def _channel_parts(rss):
+    # Declaration, <rss>, <channel> and its metadata, then the closing tags,
+    # as bytes around the point where items go.
+    document = etree.tostring(rss, encoding="utf-8", xml_declaration=True, pretty_print=True)
+    head, closing, tail = document.rpartition(b"</channel>")
+    return head.rstrip(b" "), b"  " + closing + tail
+
+def write_feed(rss, fragments, output_file, max_items=MAX_FEED_ITEMS, max_age=MAX_ITEM_AGE):
+    # rss holds the channel metadata only; fragments is an iterable of
+    # feed_fragments.Fragment, typically render_fragments() over the posts.
+    # The file is assembled from the fragments' bytes as they arrive, with no
+    # parsing of unchanged items. Returns the number of items written.
+    now = time.time()
+    rolling = FEED_MODE == "rolling"
+    key = _feed_key(output_file)
+    manifest, first_seen = _load_manifest(load_json(MANIFEST_FILE, {}) if rolling else {}, key)
+    head, foot = _channel_parts(rss)
+    written = []
+    new, kept, expired, dropped = 0, 0, 0, 0
+    # The old feed may be read while writing, so write beside it and swap.
+    tmp_file = f"{output_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, "wb") as f:
+            f.write(head)
+            for fragment in fragments:
+                if new >= max_items:
+                    dropped += 1
+                    continue
+                f.write(b"    " + fragment.body + b"\n")
+                written.append([fragment.guid, fragment.key, first_seen.get(_merge_key(fragment.guid), now)])
+                new += 1
+            if rolling:
+                # This run's items come first; old items follow unless this
+                # run rewrote the same post. Feeds written before the merge
+                # key may hold a post twice; only its first copy is kept.
+                skip = {_merge_key(guid) for guid, _, _ in written}
+                for guid, fragment_key, body in _previous_fragments(output_file, manifest, skip):
+                    merge_key = _merge_key(guid)
+                    if merge_key in skip:
+                        continue
+                    skip.add(merge_key)
+                    since = first_seen.get(merge_key, now)
+                    if now - since > max_age:
+                        expired += 1
+                    elif len(written) >= max_items:
+                        dropped += 1
+                    else:
+                        f.write(b"    " + body + b"\n")
+                        written.append([guid, fragment_key, since])
+                        kept += 1
+            f.write(foot)
+    except BaseException:
+        # A post that fails to render leaves the previous feed in place.
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    os.replace(tmp_file, output_file)
+    if rolling:
+        # Other feeds may have been written since we loaded, by another site
+        # thread or process; only this feed's entry is replaced.
+        with _manifest_lock:
+            all_manifests = load_json(MANIFEST_FILE, {})
+            all_manifests[key] = [entry for entry in written if entry[0]]
+            save_json(MANIFEST_FILE, all_manifests)
+        log_step(f"Rolling feed: {new} new, {kept} kept, {expired} expired, {dropped} over the {max_items} item limit")
+    return len(written)
+
+class StreamAborted(Exception):
+    pass
+
+async def stream_feed(generate, posts):
+    # Runs generate(items), the site's generate_rss_feed(), in a worker thread
+    # while the async iterable posts is still producing, and hands the posts
+    # over one at a time, so no list of every post's content is ever built.
+    # generate() only starts with the first post: a run that found nothing
+    # leaves feed.xml alone. If posts fails, the writer is aborted and the old
+    # feed stays. Returns the number of posts handed over.
+    handoff = queue.Queue(maxsize=STREAM_BUFFER)
+    end, abort = object(), object()
+    finished = False
+
+    def items():
+        nonlocal finished
+        while not finished:
+            item = handoff.get()
+            if item is end or item is abort:
+                finished = True
+                if item is abort:
+                    raise StreamAborted("post stream failed")
+                return
+            yield item
+
+    def write():
+        try:
+            generate(items())
+        finally:
+            # generate() may give up early; keep draining so the scrape loop
+            # never blocks on a full queue.
+            for _ in items():
+                pass
+
+    writer = None
+    count = 0
+    try:
+        async for post in posts:
+            if writer is None:
+                writer = asyncio.create_task(asyncio.to_thread(write))
+            await asyncio.to_thread(handoff.put, post)
+            count += 1
+    except BaseException:
+        if writer is not None:
+            await asyncio.to_thread(handoff.put, abort)
+            await asyncio.gather(writer, return_exceptions=True)
+        raise
+    if writer is not None:
+        await asyncio.to_thread(handoff.put, end)
+        await writer
+    return count
@@ -0,0 +1,78 @@
+import asyncio
+from urllib.parse import urlparse
+from common.host_limiter import MAX_CONCURRENCY
+from common.log import log_step
+from common.post_index import get_post_index
+from common.retry_policy import run_deadline, start_post_deadline
+
+# Posts rendered at once across the whole run, and per host within it. The
+# per-host cap is only an upper bound: the host limiter decides how many of
+# those actually hit the server at once.
+MAX_CONCURRENT_PAGES = 6
+MAX_PAGES_PER_HOST = MAX_CONCURRENCY
+
+_shared_limits = None
+
+def share_limits(max_concurrency=MAX_CONCURRENT_PAGES, per_host=MAX_PAGES_PER_HOST):
+    # Makes every later iter_full_contents() call draw from one run-wide
+    # and one per-host budget, for run_all running all sites on one loop.
+    # Call it from inside that loop.
+    global _shared_limits
+    _shared_limits = (asyncio.Semaphore(max_concurrency), {}, per_host)
+
+async def iter_full_contents(posts, fetch, headers, max_concurrency=MAX_CONCURRENT_PAGES, per_host=MAX_PAGES_PER_HOST):
+    # Yields (post, (content, featured_image, video_urls)) in the same order
+    # as `posts`, each as soon as it and the posts before it are done, so the
+    # caller can hand posts on while later ones are still rendering.
+    if _shared_limits is not None:
+        run_limit, host_limits, per_host = _shared_limits
+    else:
+        run_limit = asyncio.Semaphore(max_concurrency)
+        host_limits = {}
+    index = get_post_index()
+
+    async def fetch_one(idx, post):
+        # Posts rendered in an earlier run come straight from the index.
+        known = index.lookup(post['link'])
+        if known is not None:
+            log_step(f"Reusing indexed content for post {idx + 1}/{len(posts)}: {post['link']}")
+            return known
+        host = urlparse(post['link']).netloc
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(per_host))
+        # Wait for the host slot first so a busy host never holds run slots
+        # that another host could be using.
+        async with host_limit:
+            async with run_limit:
+                run = run_deadline()
+                if run is not None and run.expired():
+                    log_step(f"Run deadline reached, skipping {post['link']}")
+                    return '', '', []
+                log_step(f"Fetching post {idx + 1}/{len(posts)}: {post['link']}")
+                deadline = start_post_deadline()
+                try:
+                    content, featured_image, videos = await asyncio.wait_for(fetch(post['link'], headers), deadline.remaining())
+                except asyncio.TimeoutError:
+                    log_step(f"Post deadline reached for {post['link']}")
+                    return '', '', []
+                except Exception as e:
+                    log_step(f"Error fetching content from {post['link']}: {str(e)}")
+                    return '', '', []
+                # Failed fetches come back empty and are retried next run.
+                if content:
+                    index.store(post['link'], content, featured_image, videos)
+                return content, featured_image, videos
+
+    tasks = [asyncio.create_task(fetch_one(idx, post)) for idx, post in enumerate(posts)]
+    try:
+        for idx, post in enumerate(posts):
+            result = await tasks[idx]
+            # Let go of the finished task, so its content is freed once the
+            # caller is done with it.
+            tasks[idx] = None
+            yield post, result
+    finally:
+        # A caller that stops early leaves nothing rendering behind it.
+        pending = [task for task in tasks if task is not None]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,183 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from common.lifecycle import on_shutdown
+from common.log import log_step
+
+# AIMD per host. Each host starts at INITIAL_CONCURRENCY requests in flight.
+# Every successful response whose latency stays within STABLE_LATENCY_FACTOR
+# of the host's running average adds 1/limit, so the limit grows by about one
+# per round of requests. A 429, a 5xx or a timeout halves the limit and pauses
+# the host, for Retry-After if the server sent one and otherwise for a
+# backoff that doubles with each consecutive failure.
+INITIAL_CONCURRENCY = 2
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 8
+STABLE_LATENCY_FACTOR = 1.5
+LATENCY_SMOOTHING = 0.2
+BASE_COOLDOWN = 2
+MAX_COOLDOWN = 120
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+
+def retry_after_seconds(value):
+    # Retry-After is either delta-seconds or an HTTP date.
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class _HostState:
+    def __init__(self):
+        self.limit = float(INITIAL_CONCURRENCY)
+        self.in_flight = 0
+        self.avg_latency = None
+        self.paused_until = 0.0
+        self.failures = 0
+        self.requests = 0
+        self.throttled = 0
+
+    def wait_time(self):
+        # Seconds until a slot may be taken; 0 means go now.
+        paused = self.paused_until - time.monotonic()
+        if paused > 0:
+            return paused
+        return 0 if self.in_flight < int(self.limit) else None
+
+class Slot:
+    # Handed out by HostLimiter.slot(); the caller reports what the server
+    # answered. Leaving the block with an exception counts as a failure.
+    def __init__(self):
+        self.status = None
+        self.retry_after = None
+
+    def record(self, status, retry_after=None):
+        self.status = status
+        self.retry_after = retry_after_seconds(retry_after)
+
+    def record_response(self, response):
+        if response is not None:
+            self.record(response.status_code, response.headers.get('Retry-After'))
+
+class HostLimiter:
+    def __init__(self):
+        self._hosts = {}
+        self._cond = threading.Condition()
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState()
+        return state
+
+    def _try_acquire(self, host):
+        # Returns None once a slot is taken, else how long to wait (None in
+        # the tuple means "until a slot frees up").
+        with self._cond:
+            state = self._state(host)
+            wait = state.wait_time()
+            if wait == 0:
+                state.in_flight += 1
+                return None
+            return (wait,)
+
+    def _release(self, host, slot, latency, failed, cancelled=False):
+        with self._cond:
+            state = self._state(host)
+            state.in_flight -= 1
+            if cancelled:
+                self._cond.notify_all()
+                return
+            state.requests += 1
+            if failed or slot.status in THROTTLE_STATUSES:
+                state.throttled += 1
+                state.failures += 1
+                state.limit = max(MIN_CONCURRENCY, state.limit / 2)
+                cooldown = slot.retry_after
+                if cooldown is None:
+                    cooldown = min(MAX_COOLDOWN, BASE_COOLDOWN * 2 ** (state.failures - 1))
+                state.paused_until = max(state.paused_until, time.monotonic() + cooldown)
+                log_step(f"Throttling {host}: {slot.status or 'error'}, limit {state.limit:.1f}, pausing {cooldown:.1f}s")
+            else:
+                state.failures = 0
+                if state.avg_latency is None or latency <= state.avg_latency * STABLE_LATENCY_FACTOR:
+                    state.limit = min(MAX_CONCURRENCY, state.limit + 1 / state.limit)
+                if state.avg_latency is None:
+                    state.avg_latency = latency
+                else:
+                    state.avg_latency += LATENCY_SMOOTHING * (latency - state.avg_latency)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, url):
+        host = urlparse(url).netloc
+        # Checking and waiting under one hold of the lock, so a release
+        # between the two cannot be missed.
+        with self._cond:
+            state = self._state(host)
+            wait = state.wait_time()
+            while wait != 0:
+                self._cond.wait(timeout=wait)
+                wait = state.wait_time()
+            state.in_flight += 1
+        slot = Slot()
+        started = time.monotonic()
+        failed = False
+        try:
+            yield slot
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._release(host, slot, time.monotonic() - started, failed)
+
+    @asynccontextmanager
+    async def async_slot(self, url):
+        # Polls instead of blocking on the condition so waiting never ties up
+        # the event loop or a worker thread.
+        host = urlparse(url).netloc
+        while True:
+            wait = self._try_acquire(host)
+            if wait is None:
+                break
+            await asyncio.sleep(min(wait[0] or 0.05, 1.0))
+        slot = Slot()
+        started = time.monotonic()
+        failed = cancelled = False
+        try:
+            yield slot
+        except asyncio.CancelledError:
+            # A deadline or shutdown cancelled the request; that says nothing
+            # about the host either way.
+            cancelled = True
+            raise
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._release(host, slot, time.monotonic() - started, failed, cancelled)
+
+    def summary(self):
+        with self._cond:
+            return {host: (state.requests, state.throttled, state.limit) for host, state in self._hosts.items()}
+
+_limiter = HostLimiter()
+
+def host_slot(url):
+    return _limiter.slot(url)
+
+def async_host_slot(url):
+    return _limiter.async_slot(url)
+
+@on_shutdown
+def log_host_limits():
+    for host, (requests, throttled, limit) in _limiter.summary().items():
+        log_step(f"Host {host}: {requests} requests, {throttled} throttled, final concurrency {limit:.1f}")
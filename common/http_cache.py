@@ -0,0 +1,146 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+import requests
+from requests.structures import CaseInsensitiveDict
+from common.lifecycle import on_shutdown
+from common.log import log_step
+
+# RSSFEED_HTTP_CACHE=0 turns the cache off.
+CACHE_ENABLED = os.environ.get("RSSFEED_HTTP_CACHE", "1") != "0"
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".http_cache")
+CACHE_FILE = os.path.join(CACHE_DIR, "responses.sqlite3")
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+
+# First matching pattern sets how long a 200 response for that URL is served
+# from disk. URLs matching none are never cached.
+CACHE_RULES = [
+    # media files: the featured-image and video probes
+    (re.compile(r"\.(jpe?g|png|gif|webp|mp4|webm|mov)(\?|$)", re.I), 7 * 24 * 3600),
+    # listing pages; short, so a re-run after a crash skips them but the next
+    # scheduled run still sees new posts. ilbe and clien post links carry the
+    # listing's page=/po= too, so the query form only counts on listing paths.
+    (re.compile(r"/page/\d+/?$|/(list|service/group|newskey)/.*[?&](page|po)=\d+"), 10 * 60),
+    # post pages fetched statically
+    (re.compile(r"^https?://(ggoorr\.net|www\.ilbe\.com|clien\.net|zdnet\.co\.kr)/"), 6 * 3600),
+]
+
+def ttl_for(url):
+    for pattern, ttl in CACHE_RULES:
+        if pattern.search(url):
+            return ttl
+    return 0
+
+class HttpCache:
+    # Bodies are zlib-compressed in one SQLite file. last_access drives LRU
+    # eviction once the stored bodies exceed max_bytes.
+    def __init__(self, path=CACHE_FILE, max_bytes=MAX_CACHE_BYTES):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, status INTEGER, headers TEXT, encoding TEXT,"
+            " body BLOB, size INTEGER, expires_at REAL, last_access REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def get(self, method, url):
+        key = f"{method} {url}"
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, encoding, body FROM responses WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+        status, headers, encoding, body = row
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        response.encoding = encoding
+        response._content = zlib.decompress(body)
+        response.url = url
+        response.from_cache = True
+        return response
+
+    def store(self, method, url, response, ttl):
+        body = zlib.compress(response.content if method != "HEAD" else b"")
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (f"{method} {url}", response.status_code, json.dumps(dict(response.headers)),
+                 response.encoding, body, len(body), now + ttl, now),
+            )
+            self.stores += 1
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now):
+        self.evictions += self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+        log_step(f"HTTP cache: {self.hits} hits, {self.misses} misses, {self.stores} stored, {self.evictions} evicted")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_http_cache():
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache()
+        return _cache
+
+@on_shutdown
+def close_http_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+
+def cached_request(method, url, send):
+    # send() performs the real request. Only 200 responses for URLs with a
+    # CACHE_RULES entry are kept.
+    ttl = ttl_for(url)
+    cache = get_http_cache() if ttl else None
+    if cache is None:
+        return send()
+    response = cache.get(method, url)
+    if response is not None:
+        return response
+    response = send()
+    if response.status_code == 200:
+        cache.store(method, url, response, ttl)
+    return response
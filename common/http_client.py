@@ -0,0 +1,69 @@
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from common.host_limiter import host_slot
+from common.http_cache import cached_request
+from common.lifecycle import on_shutdown
+from common.retry_policy import with_retries, status_error
+
+# Sent with every request unless the caller overrides a header. Sites pass
+# this as their HEADERS, so the browser contexts use the same User-Agent.
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/122.0.0.0 Safari/537.36"
+}
+
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(url):
+    # One keep-alive session per host, so repeated requests to the same site
+    # reuse TCP/TLS connections instead of handshaking every time.
+    host = urlparse(url).netloc
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            # No adapter retries: retry_policy decides, with the host limiter
+            # seeing every attempt.
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[host] = session
+        return session
+
+def _send(method, url, kwargs):
+    # Cache hits never reach here, so they do not count against the host.
+    with host_slot(url) as slot:
+        response = get_session(url).request(method, url, **kwargs)
+        slot.record_response(response)
+        return response
+
+def _send_with_retries(method, url, kwargs):
+    return with_retries(lambda: _send(method, url, kwargs), f"{method} {url}", status_error)
+
+def http_get(url, **kwargs):
+    return cached_request("GET", url, lambda: _send_with_retries("GET", url, kwargs))
+
+def http_head(url, **kwargs):
+    return cached_request("HEAD", url, lambda: _send_with_retries("HEAD", url, kwargs))
+
+def decoded_text(response):
+    # requests falls back to ISO-8859-1 when the header has no charset, which
+    # garbles Korean pages; let it sniff the body instead.
+    if response.encoding is None or response.encoding.lower() == 'iso-8859-1':
+        response.encoding = response.apparent_encoding
+    return response.text
+
+@on_shutdown
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,38 @@
+import inspect
+from contextlib import contextmanager
+from common.log import log_step
+
+# Shared modules register their end-of-run cleanup here (closing browsers,
+# flushing state files) so each site's main() only has to call shutdown().
+_hooks = []
+
+def on_shutdown(hook):
+    if hook not in _hooks:
+        _hooks.append(hook)
+    return hook
+
+_holds = 0
+
+@contextmanager
+def shutdown_held():
+    # run_all's in-process scheduler runs every site on one loop with shared
+    # pools; while held, a site finishing must not close them under the
+    # others, so shutdown() does nothing until the scheduler's own call.
+    global _holds
+    _holds += 1
+    try:
+        yield
+    finally:
+        _holds -= 1
+
+async def shutdown():
+    if _holds:
+        return
+    # Reverse registration order: later layers are built on earlier ones.
+    for hook in reversed(_hooks):
+        try:
+            result = hook()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            log_step(f"Shutdown hook {hook.__name__} failed: {str(e)}")
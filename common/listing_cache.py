@@ -0,0 +1,110 @@
+import copy
+import threading
+import time
+from common.http_client import http_get, decoded_text
+from common.lifecycle import on_shutdown
+from common.log import log_step
+from common.state import state_path, load_json, save_json
+
+STATE_FILE = state_path("listing_validators.json")
+LISTING_TIMEOUT = 10
+# Entries for listing URLs no longer requested are dropped after this long.
+ENTRY_MAX_AGE = 30 * 24 * 3600
+
+class ValidatorCache:
+    # Per listing URL: the ETag / Last-Modified the server sent and the post
+    # list parsed from that response. A 304 reuses the post list as-is.
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self._entries = load_json(path, {})
+        self._updated = {}
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        self.downloaded = 0
+
+    def conditional_headers(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def cached_posts(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            entry["checked"] = time.time()
+            self._updated[url] = entry
+            self.not_modified += 1
+            # Callers add content to the post dicts, so never hand out ours.
+            return copy.deepcopy(entry["posts"])
+
+    def store(self, url, response_headers, posts):
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+        with self._lock:
+            self.downloaded += 1
+            if not etag and not last_modified:
+                self._entries.pop(url, None)
+                return
+            entry = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "posts": copy.deepcopy(posts),
+                "checked": time.time(),
+            }
+            self._entries[url] = entry
+            self._updated[url] = entry
+
+    def save(self):
+        with self._lock:
+            # Merge with what other site processes wrote since we loaded.
+            entries = load_json(self.path, {})
+            entries.update(self._updated)
+            cutoff = time.time() - ENTRY_MAX_AGE
+            entries = {url: entry for url, entry in entries.items() if entry.get("checked", 0) >= cutoff}
+            save_json(self.path, entries)
+            log_step(f"Listing pages: {self.not_modified} not modified, {self.downloaded} downloaded")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_validator_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ValidatorCache()
+        return _cache
+
+@on_shutdown
+def save_validator_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.save()
+            _cache = None
+
+def fetch_listing(page_url, headers, parse, **request_kwargs):
+    # parse(html) -> list of post dicts. Sends the stored validators, and on
+    # 304 Not Modified returns the previous parse without downloading the page.
+    cache = get_validator_cache()
+    request_headers = dict(headers)
+    request_headers.update(cache.conditional_headers(page_url))
+    response = http_get(page_url, headers=request_headers, timeout=LISTING_TIMEOUT, **request_kwargs)
+    if response.status_code == 304:
+        posts = cache.cached_posts(page_url)
+        if posts is not None:
+            log_step(f"Listing not modified, reusing {len(posts)} posts for {page_url}")
+            return posts
+        # Validators without a stored entry should not happen; refetch plainly.
+        response = http_get(page_url, headers=headers, timeout=LISTING_TIMEOUT, **request_kwargs)
+    response.raise_for_status()
+    posts = parse(decoded_text(response))
+    cache.store(page_url, response.headers, posts)
+    return posts
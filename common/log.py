@@ -0,0 +1,11 @@
+import contextvars
+
+# Shared modules have no steps.log of their own. Each site's main() binds its
+# log_step here so messages from common/ land in that site's log file.
+_site_logger = contextvars.ContextVar("site_logger", default=print)
+
+def bind_log(logger):
+    _site_logger.set(logger)
+
+def log_step(message):
+    _site_logger.get()(message)
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import threading
+import time
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from common.http_client import http_head
+from common.lifecycle import on_shutdown
+from common.log import log_step
+from common.state import state_path, load_json, save_json
+
+STATE_FILE = state_path("media_checks.json")
+MEDIA_TIMEOUT = 5
+MAX_MEDIA_CHECKS = 8
+# A reachable file is trusted for a week; a failed check is retried sooner
+# in case the CDN was only briefly down.
+OK_TTL = 7 * 24 * 3600
+FAILED_TTL = 24 * 3600
+
+class MediaCheckCache:
+    # Per media URL: the HEAD status, Content-Type and Content-Length, and when
+    # they were fetched.
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self._entries = load_json(path, {})
+        self._updated = {}
+        self._lock = threading.Lock()
+        self.cached = 0
+        self.checked = 0
+
+    def lookup(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            ttl = OK_TTL if entry["status"] == 200 else FAILED_TTL
+            if time.time() - entry["checked"] > ttl:
+                return None
+            self.cached += 1
+            return entry
+
+    def check(self, url, headers):
+        entry = self.lookup(url)
+        if entry is not None:
+            return entry
+        try:
+            response = http_head(url, headers=headers, timeout=MEDIA_TIMEOUT, allow_redirects=True)
+            entry = {
+                "status": response.status_code,
+                "content_type": response.headers.get("Content-Type", ""),
+                "length": int(response.headers.get("Content-Length") or 0),
+            }
+        except Exception as e:
+            log_step(f"Failed to check media {url}: {str(e)}")
+            entry = {"status": 0, "content_type": "", "length": 0}
+        entry["checked"] = time.time()
+        with self._lock:
+            self.checked += 1
+            self._entries[url] = entry
+            self._updated[url] = entry
+        return entry
+
+    def save(self):
+        with self._lock:
+            # Merge with what other site processes wrote since we loaded.
+            entries = load_json(self.path, {})
+            entries.update(self._updated)
+            cutoff = time.time() - OK_TTL
+            entries = {url: entry for url, entry in entries.items() if entry.get("checked", 0) >= cutoff}
+            save_json(self.path, entries)
+            log_step(f"Media checks: {self.cached} cached, {self.checked} checked")
+
+_cache = None
+
+def get_media_cache():
+    global _cache
+    if _cache is None:
+        _cache = MediaCheckCache()
+    return _cache
+
+@on_shutdown
+def save_media_cache():
+    global _cache
+    if _cache is not None:
+        _cache.save()
+        _cache = None
+
+async def check_media(urls, headers=None, max_workers=MAX_MEDIA_CHECKS):
+    # Returns {url: entry} for the distinct urls, checking uncached ones
+    # concurrently.
+    cache = get_media_cache()
+    limit = asyncio.Semaphore(max_workers)
+    unique = list(dict.fromkeys(url for url in urls if url))
+
+    async def check_one(url):
+        async with limit:
+            return await asyncio.to_thread(cache.check, url, headers)
+
+    entries = await asyncio.gather(*(check_one(url) for url in unique))
+    return dict(zip(unique, entries))
+
+async def verify_featured_images(posts, headers):
+    # Drops featured images that do not answer 200 and records the size of
+    # the ones that do as post['featured_image_length'] for the enclosure.
+    results = await check_media([post.get('featured_image') for post in posts], headers)
+    for post in posts:
+        url = post.get('featured_image')
+        if not url:
+            continue
+        entry = results[url]
+        if entry["status"] != 200:
+            log_step(f"Featured image {url} returned {entry['status'] or 'an error'}, dropping it")
+            post['featured_image'] = None
+        else:
+            post['featured_image_length'] = entry["length"]
+
+# RSSFEED_CHECK_VIDEOS=0 skips the video check; it only ever warned, so the
+# feed comes out the same either way.
+CHECK_VIDEOS = os.environ.get("RSSFEED_CHECK_VIDEOS", "1") != "0"
+
+def _parsed_video_sources(post):
+    soup = BeautifulSoup(post.get('content') or '', 'lxml')
+    return [video['src'] for video in soup.find_all('video') if video.get('src')]
+
+async def _video_sources(post):
+    # Extraction hands over post['videos']; only posts indexed before it did
+    # have their HTML parsed again, off the event loop.
+    videos = post.get('videos')
+    if videos is None:
+        videos = await asyncio.to_thread(_parsed_video_sources, post)
+    return [urljoin(post.get('link') or '', src) for src in videos]
+
+async def validate_videos(posts, headers=None):
+    # Warns about <video> sources that are unreachable or not served as
+    # video, before the feed is written instead of while it is.
+    if not CHECK_VIDEOS:
+        log_step("Video check skipped (RSSFEED_CHECK_VIDEOS=0)")
+        return
+    sources = [src for videos in await asyncio.gather(*(_video_sources(post) for post in posts)) for src in videos]
+    for src, entry in (await check_media(sources, headers)).items():
+        log_step(f"Video URL {src} status: {entry['status']}, Content-Type: {entry['content_type']}")
+        if entry["status"] != 200 or 'video/' not in entry["content_type"]:
+            log_step(f"Warning: Video URL {src} may not be accessible or is not a video")
@@ -0,0 +1,92 @@
+import asyncio
+from common.log import log_step
+from common.post_index import get_post_index, refetch_current_run
+from common.state import state_path, load_json, save_json
+
+# Listing pages fetched at once per site.
+MAX_LISTING_WORKERS = 4
+# Pagination stops after this many consecutive listing pages whose posts are
+# all in the post index, except on every DEEP_SCAN_EVERY-th run of a site,
+# which reads every page and refetches every post so edits further down the
+# listing are picked up.
+KNOWN_PAGES_TO_STOP = 2
+DEEP_SCAN_EVERY = 24
+RUNS_FILE = state_path("pagination_runs.json")
+
+def _deep_scan_due(site_key, deep_scan_every):
+    runs = load_json(RUNS_FILE, {})
+    runs[site_key] = runs.get(site_key, 0) + 1
+    save_json(RUNS_FILE, runs)
+    return deep_scan_every > 0 and runs[site_key] % deep_scan_every == 0
+
+class EarlyStop:
+    # Fed each listing page's posts in page order; should_stop() says when
+    # reading further pages would only find posts already fetched.
+    def __init__(self, site_key, stop_after=KNOWN_PAGES_TO_STOP, deep_scan_every=DEEP_SCAN_EVERY):
+        self.stop_after = stop_after
+        self.deep_scan = _deep_scan_due(site_key, deep_scan_every)
+        self.streak = 0
+        if self.deep_scan:
+            refetch_current_run()
+            log_step(f"Deep scan run for {site_key}: reading every listing page and post")
+
+    def should_stop(self, page_num, posts):
+        if self.deep_scan or self.stop_after <= 0:
+            return False
+        # An empty page is usually a failed fetch, not proof there is
+        # nothing new, so it breaks the streak.
+        index = get_post_index()
+        if posts and all(index.known(post['link']) for post in posts):
+            self.streak += 1
+        else:
+            self.streak = 0
+        if self.streak >= self.stop_after:
+            log_step(f"Stopping pagination after page {page_num}: {self.streak} pages with no new posts")
+            return True
+        return False
+
+    def lookahead(self, max_workers):
+        # How many pages to have in flight from the next one on. While pages
+        # keep turning up new posts every worker is used; during a streak of
+        # known pages only the stop_after - streak pages that are needed
+        # before a stop is possible.
+        if self.deep_scan or self.stop_after <= 0 or self.streak == 0:
+            return max_workers
+        return max(1, min(max_workers, self.stop_after - self.streak))
+
+async def fetch_listing_pages(pages, fetch_page, max_workers=MAX_LISTING_WORKERS,
+                              stop_after=KNOWN_PAGES_TO_STOP, deep_scan_every=DEEP_SCAN_EVERY):
+    # pages: [(page_num, url)] in listing order. fetch_page(url) is the site's
+    # blocking get_links_and_titles() call and runs in a worker thread.
+    # Returns all posts merged in page order, whatever order pages finish in,
+    # up to the page where EarlyStop ends the listing.
+    if not pages:
+        return []
+    limit = asyncio.Semaphore(max_workers)
+    early_stop = EarlyStop(pages[0][1], stop_after, deep_scan_every)
+
+    async def fetch_one(page_num, url):
+        async with limit:
+            log_step(f"Scraping page {page_num}: {url}")
+            try:
+                return await asyncio.to_thread(fetch_page, url)
+            except Exception as e:
+                log_step(f"Failed to scrape page {page_num}: {str(e)}")
+                return []
+
+    tasks = []
+    merged = []
+    try:
+        for i, (page_num, _) in enumerate(pages):
+            while len(tasks) < min(len(pages), i + early_stop.lookahead(max_workers)):
+                tasks.append(asyncio.create_task(fetch_one(*pages[len(tasks)])))
+            posts = await tasks[i]
+            merged.extend(posts)
+            if early_stop.should_stop(page_num, posts):
+                break
+    finally:
+        # Pages started ahead of the stop are dropped.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return merged
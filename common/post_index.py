@@ -0,0 +1,125 @@
+import contextvars
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from common.lifecycle import on_shutdown
+from common.log import log_step
+
+# Content extracted in earlier runs, keyed by canonical post link, so a post
+# is rendered once rather than on every run it stays listed. Losing the file
+# only costs one full re-render, so it is kept out of git like .http_cache.
+INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".post_index")
+INDEX_FILE = os.path.join(INDEX_DIR, "posts.sqlite3")
+# Stored content older than this is fetched again (posts do get edited) and
+# eventually pruned.
+POST_MAX_AGE = 7 * 24 * 3600
+# RSSFEED_REFETCH=1 ignores the index for one run and refreshes it.
+REFETCH = os.environ.get("RSSFEED_REFETCH", "0") == "1"
+# Set by refetch_current_run() for one site's run only (a deep scan in
+# pagination); a context variable so other sites on the same loop keep
+# using the index.
+_refetch_run = contextvars.ContextVar("refetch_run", default=False)
+
+_PAGE_SUFFIX = re.compile(r"/page/\d+/?$")
+_PAGE_PARAMS = {"page", "po"}
+
+def canonical_link(url):
+    # The same post shows up under different listing pages, with a
+    # "/page/N" suffix or page query parameter, tracking parameters, or a
+    # comment fragment.
+    parts = urlsplit(url.strip())
+    path = _PAGE_SUFFIX.sub("", parts.path) or "/"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in _PAGE_PARAMS and not key.startswith("utm_")
+    ))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+def refetch_current_run():
+    _refetch_run.set(True)
+
+def _refetching():
+    return REFETCH or _refetch_run.get()
+
+class PostIndex:
+    def __init__(self, path=INDEX_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS posts ("
+            " link TEXT PRIMARY KEY, content BLOB, featured_image TEXT, fetched_at REAL, videos TEXT)"
+        )
+        if "videos" not in {row[1] for row in self._db.execute("PRAGMA table_info(posts)")}:
+            # Rows from before video URLs were stored read back as unknown.
+            self._db.execute("ALTER TABLE posts ADD COLUMN videos TEXT")
+        self._db.commit()
+        self.reused = 0
+        self.fetched = 0
+
+    def lookup(self, url):
+        # Returns the stored (content, featured_image, video_urls), or None
+        # when the post has to be fetched. video_urls is None for rows stored
+        # before they were kept.
+        if _refetching():
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content, featured_image, videos FROM posts WHERE link = ? AND fetched_at > ?",
+                (canonical_link(url), time.time() - POST_MAX_AGE),
+            ).fetchone()
+            if row is None:
+                return None
+            self.reused += 1
+        videos = json.loads(row[2]) if row[2] is not None else None
+        return zlib.decompress(row[0]).decode("utf-8"), row[1] or '', videos
+
+    def known(self, url):
+        # Same freshness rule as lookup(), without counting a reuse.
+        if _refetching():
+            return False
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM posts WHERE link = ? AND fetched_at > ?",
+                (canonical_link(url), time.time() - POST_MAX_AGE),
+            ).fetchone() is not None
+
+    def store(self, url, content, featured_image, videos):
+        with self._lock:
+            self.fetched += 1
+            self._db.execute(
+                "INSERT OR REPLACE INTO posts (link, content, featured_image, fetched_at, videos) VALUES (?, ?, ?, ?, ?)",
+                (canonical_link(url), zlib.compress(content.encode("utf-8")), featured_image or '', time.time(), json.dumps(videos or [])),
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.execute("DELETE FROM posts WHERE fetched_at <= ?", (time.time() - POST_MAX_AGE,))
+            self._db.commit()
+            self._db.close()
+        log_step(f"Post index: {self.reused} reused, {self.fetched} fetched")
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_post_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PostIndex()
+        return _index
+
+@on_shutdown
+def close_post_index():
+    global _index
+    with _index_lock:
+        if _index is not None:
+            _index.close()
+            _index = None
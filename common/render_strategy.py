@@ -0,0 +1,87 @@
+import threading
+import time
+from urllib.parse import urlparse
+from common.lifecycle import on_shutdown
+from common.log import log_step
+from common.state import state_path, load_json, save_json
+
+STATE_FILE = state_path("render_strategy.json")
+
+# A host is served statically when at least this share of its static fetches
+# found the content selector.
+STATIC_MIN_HIT_RATIO = 0.8
+# Within one run, give up on static fetches for a host after this many misses
+# without a single hit.
+MIN_STATIC_ATTEMPTS = 3
+# Hosts that need the browser are re-probed after this many runs or this much
+# time, so a site that drops its JS rendering is noticed.
+PROBE_EVERY_RUNS = 12
+PROBE_MAX_AGE = 7 * 24 * 3600
+
+class RenderStrategy:
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self._state = load_json(path, {})
+        self._run = {}
+        self._lock = threading.Lock()
+
+    def _probe_due(self, record):
+        return (record.get("runs_since_probe", 0) >= PROBE_EVERY_RUNS
+                or time.time() - record.get("last_probe", 0) >= PROBE_MAX_AGE)
+
+    def should_try_static(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            run = self._run.setdefault(host, {"hits": 0, "misses": 0})
+            if run["hits"] == 0 and run["misses"] >= MIN_STATIC_ATTEMPTS:
+                return False
+            record = self._state.get(host)
+            if record is None or record.get("strategy") == "static":
+                return True
+            return self._probe_due(record)
+
+    def record_static(self, url, hit):
+        host = urlparse(url).netloc
+        with self._lock:
+            run = self._run.setdefault(host, {"hits": 0, "misses": 0})
+            run["hits" if hit else "misses"] += 1
+
+    def save(self):
+        with self._lock:
+            # Re-read so hosts written by other site processes since our load
+            # are kept; only the hosts this run touched are updated.
+            state = load_json(self.path, {})
+            now = time.time()
+            for host, run in self._run.items():
+                record = state.get(host) or self._state.get(host) or {"runs_since_probe": 0, "last_probe": 0}
+                attempts = run["hits"] + run["misses"]
+                if attempts:
+                    ratio = run["hits"] / attempts
+                    strategy = "static" if ratio >= STATIC_MIN_HIT_RATIO else "browser"
+                    if strategy != record.get("strategy"):
+                        log_step(f"Render strategy for {host}: {record.get('strategy', 'unknown')} -> {strategy} (static hit ratio {ratio:.2f})")
+                    record.update(strategy=strategy, static_hit_ratio=round(ratio, 2), last_probe=now, runs_since_probe=0)
+                else:
+                    record["runs_since_probe"] = record.get("runs_since_probe", 0) + 1
+                state[host] = record
+            save_json(self.path, state)
+            self._state = state
+            self._run = {}
+
+_strategy = None
+_strategy_lock = threading.Lock()
+
+def get_render_strategy():
+    global _strategy
+    with _strategy_lock:
+        if _strategy is None:
+            _strategy = RenderStrategy()
+        return _strategy
+
+@on_shutdown
+def save_render_strategy():
+    global _strategy
+    with _strategy_lock:
+        if _strategy is not None:
+            _strategy.save()
+            _strategy = None
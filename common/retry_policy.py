@@ -0,0 +1,142 @@
+import asyncio
+import contextvars
+import os
+import random
+import time
+import requests
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeout
+from common.log import log_step
+
+# How many attempts each class of error gets and the base of its exponential
+# backoff, in seconds. Errors outside these classes (4xx, parse errors,
+# SelectorTimeout) are not retried.
+RETRY_RULES = {
+    "throttled": (4, 2.0),   # 429, 503
+    "server": (3, 1.0),      # other 5xx
+    "connection": (3, 0.5),  # DNS, refused, reset
+    "timeout": (2, 1.0),     # each attempt already costs a full timeout
+}
+MAX_BACKOFF = 30
+THROTTLE_STATUSES = {429, 503}
+SERVER_STATUSES = {500, 502, 504}
+
+# RSSFEED_RUN_BUDGET caps one site run in seconds so retries never push it
+# past its slot in run_all's schedule; POST_BUDGET caps a single post.
+RUN_BUDGET = float(os.environ.get("RSSFEED_RUN_BUDGET", 15 * 60))
+POST_BUDGET = 90
+
+class SelectorTimeout(Exception):
+    # The page loaded but its content selector never showed up. Playwright
+    # raises the same TimeoutError as for a page load, but loading the page
+    # again rarely helps, so this is kept out of the "timeout" class.
+    pass
+
+class Deadline:
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() == 0
+
+_run_deadline = contextvars.ContextVar("run_deadline", default=None)
+_post_deadline = contextvars.ContextVar("post_deadline", default=None)
+
+def start_run_deadline(seconds=RUN_BUDGET):
+    deadline = Deadline(seconds)
+    _run_deadline.set(deadline)
+    return deadline
+
+def run_deadline():
+    return _run_deadline.get()
+
+def start_post_deadline(seconds=POST_BUDGET):
+    # Only lives in the calling task's context; the fetch engine runs each
+    # post in its own task.
+    run = _run_deadline.get()
+    deadline = Deadline(min(seconds, run.remaining()) if run else seconds)
+    _post_deadline.set(deadline)
+    return deadline
+
+def current_deadline():
+    deadlines = [d for d in (_run_deadline.get(), _post_deadline.get()) if d is not None]
+    return min(deadlines, key=lambda d: d.expires_at) if deadlines else None
+
+def status_error(response):
+    if response.status_code in THROTTLE_STATUSES:
+        return "throttled"
+    if response.status_code in SERVER_STATUSES:
+        return "server"
+    return None
+
+def exception_error(e):
+    if isinstance(e, (requests.Timeout, PlaywrightTimeout, TimeoutError)):
+        return "timeout"
+    if isinstance(e, requests.ConnectionError):
+        return "connection"
+    if isinstance(e, PlaywrightError) and "net::ERR_" in str(e):
+        return "connection"
+    return None
+
+def _backoff(error, attempt, what):
+    # Full jitter: a random delay up to the exponential cap, so processes that
+    # failed together do not retry together. None means give up.
+    max_attempts, base = RETRY_RULES[error]
+    if attempt + 1 >= max_attempts:
+        return None
+    delay = random.uniform(0, min(MAX_BACKOFF, base * 2 ** attempt))
+    deadline = current_deadline()
+    if deadline is not None and deadline.remaining() <= delay:
+        log_step(f"Not retrying {what} after {error}: deadline reached")
+        return None
+    log_step(f"Retrying {what} after {error} in {delay:.1f}s (attempt {attempt + 2}/{max_attempts})")
+    return delay
+
+def with_retries(call, what, result_error=None):
+    # call() is retried on the exceptions exception_error() knows, and on
+    # results that result_error() flags; the last result or exception is
+    # returned or raised once the rules or the deadline say stop.
+    attempt = 0
+    while True:
+        try:
+            result = call()
+        except Exception as e:
+            error = exception_error(e)
+            if error is None:
+                raise
+            delay = _backoff(error, attempt, what)
+            if delay is None:
+                raise
+        else:
+            error = result_error(result) if result_error else None
+            if error is None:
+                return result
+            delay = _backoff(error, attempt, what)
+            if delay is None:
+                return result
+        time.sleep(delay)
+        attempt += 1
+
+async def with_retries_async(call, what, result_error=None):
+    attempt = 0
+    while True:
+        try:
+            result = await call()
+        except Exception as e:
+            error = exception_error(e)
+            if error is None:
+                raise
+            delay = _backoff(error, attempt, what)
+            if delay is None:
+                raise
+        else:
+            error = result_error(result) if result_error else None
+            if error is None:
+                return result
+            delay = _backoff(error, attempt, what)
+            if delay is None:
+                return result
+        await asyncio.sleep(delay)
+        attempt += 1
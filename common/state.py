@@ -0,0 +1,26 @@
+import json
+import os
+
+# Small JSON files that carry what the scraper learned from one run to the
+# next. Like .http_cache they stay on the machine that runs the scrapers and
+# out of git; losing them only costs a slower run.
+STATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "state")
+
+def state_path(name):
+    return os.path.join(STATE_DIR, name)
+
+def load_json(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def save_json(path, data):
+    # Write to a temp file and rename, so a crash or a second site process
+    # never leaves a half-written file behind.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
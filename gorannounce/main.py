@@ -1,7 +1,22 @@
+import asyncio
+import os
+import sys
+
+# Make the shared common/ package importable when run as `python <site>/main.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from get_link_and_title import get_links_and_titles
-from get_full_content import get_full_content
+from get_full_content import get_full_content_async
 from feed_generation import generate_rss_feed
 from log import log_step
+from common.fetch_engine import iter_full_contents
+from common.feed_writer import stream_feed
+from common.http_client import DEFAULT_HEADERS
+from common.lifecycle import shutdown
+from common.log import bind_log
+from common.media_check import validate_videos, verify_featured_images
+from common.pagination import fetch_listing_pages
+from common.retry_policy import start_run_deadline
 
 
 
@@ -9,56 +24,65 @@ BASE_URL = "https://ggoorr.net"
 TARGET_URL = BASE_URL + "/main/category/17748977/page/{page_number}"
 
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                  "AppleWebKit/537.36 (KHTML, like Gecko) "
-                  "Chrome/122.0.0.0 Safari/537.36"
-}
+HEADERS = DEFAULT_HEADERS
 START_PAGE = 1
 END_PAGE = 3
 
-def main():
-    all_posts = []
+async def scrape():
+    pages = [(page_num, TARGET_URL.format(page_number=page_num)) for page_num in range(START_PAGE, END_PAGE + 1)]
+    listed_posts = await fetch_listing_pages(pages, lambda url: get_links_and_titles(url, BASE_URL, HEADERS))
+
+    total = await stream_feed(generate_rss_feed, collect_posts(listed_posts))
+
+    log_step(f"Total posts collected: {total}")
+    print(f"Total items to process: {total}")
+    if not total:
+        log_step("No posts to generate RSS feed")
 
-    for page_num in range(START_PAGE, END_PAGE + 1):
-        url = TARGET_URL.format(page_number=page_num)
-        log_step(f"Scraping page {page_num}: {url}")
+async def collect_posts(listed_posts):
+    # Posts in listing order as their content arrives; stream_feed() hands
+    # each one to the feed writer while later ones are still being fetched.
+    count = 0
+    async for post, (content, featured_image, videos) in iter_full_contents(listed_posts, get_full_content_async, HEADERS):
         try:
-            posts = get_links_and_titles(url, BASE_URL, HEADERS)
+            # Validate post
+            if not post.get('title') or not post.get('link'):
+                log_step(f"Skipping invalid post: {post}")
+                continue
+            # Failed or skipped fetches come back empty and are retried next
+            # run; the rolling feed keeps its previous copy until then.
+            if not content:
+                log_step(f"Skipping post without content: {post['link']}")
+                continue
+            # A copy, so listed_posts never holds the content.
+            post = dict(post, content=content)
+            post['featured_image'] = featured_image
+            post['videos'] = videos
+            # Ensure categories is a list
+            post['categories'] = post.get('categories', [])
+            # Preprocess link to use /thisthat/ format
+            post['link'] = post['link'].replace('/main/', '/thisthat/').replace('/page/1', '')
+            log_step(f"Added content for: {post['title']} (link: {post['link']}, content length: {len(content)}, categories: {post['categories']})")
+            await verify_featured_images([post], HEADERS)
+            await validate_videos([post])
+            count += 1
+            # Debug logging for items
+            print(f"Item {count}: {post}")
         except Exception as e:
-            log_step(f"Failed to scrape page {page_num}: {str(e)}")
+            log_step(f"Failed to process post {post.get('title', 'unknown')}: {str(e)}")
             continue
+        yield post
 
-        for post in posts:
-            try:
-                content, featured_image = get_full_content(post['link'], HEADERS)
-                # Validate post
-                if not post.get('title') or not post.get('link'):
-                    log_step(f"Skipping invalid post: {post}")
-                    continue
-                post['content'] = content
-                post['featured_image'] = featured_image
-                # Ensure categories is a list
-                post['categories'] = post.get('categories', [])
-                # Preprocess link to use /thisthat/ format
-                post['link'] = post['link'].replace('/main/', '/thisthat/').replace('/page/1', '')
-                log_step(f"Added content for: {post['title']} (link: {post['link']}, content length: {len(content)}, categories: {post['categories']})")
-                all_posts.append(post)
-            except Exception as e:
-                log_step(f"Failed to process post {post.get('title', 'unknown')}: {str(e)}")
-                continue
-
-    log_step(f"Total posts collected: {len(all_posts)}")
-    
-    # Debug logging for items
-    print(f"Total items to process: {len(all_posts)}")
-    for idx, item in enumerate(all_posts):
-        print(f"Item {idx + 1}: {item}")
+async def run():
+    bind_log(log_step)
+    start_run_deadline()
+    try:
+        await scrape()
+    finally:
+        await shutdown()
 
-    if all_posts:
-        generate_rss_feed(all_posts)
-    else:
-        log_step("No posts to generate RSS feed")
+def main():
+    asyncio.run(run())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,6 +1,6 @@
-import requests
 from bs4 import BeautifulSoup
 from log import log_step
+from common.listing_cache import fetch_listing
 from urllib.parse import urljoin
 import urllib3
 
@@ -12,46 +12,45 @@ def get_links_and_titles(page_url, base_url, headers):
 
     try:
         # Disabled SSL verification explicitly
-        response = requests.get(page_url, headers=headers, timeout=10, verify=False)
-        response.raise_for_status()
-
-        log_step(f"Raw HTML content for {page_url}: {response.text[:500]}...")
+        return fetch_listing(page_url, headers, lambda html: parse_links_and_titles(html, page_url, base_url), verify=False)
+    except Exception as e:
+        log_step(f"Error fetching {page_url}: {str(e)}")
+        return []
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        articles = soup.select('a.subject')
+def parse_links_and_titles(html, page_url, base_url):
+    log_step(f"Raw HTML content for {page_url}: {html[:500]}...")
 
-        log_step(f"Raw anchor tags for titles: {[str(a) for a in articles]}")
+    soup = BeautifulSoup(html, 'html.parser')
+    articles = soup.select('a.subject')
 
-        results = []
+    log_step(f"Raw anchor tags for titles: {[str(a) for a in articles]}")
 
-        for a in articles:
-            title = a.get_text(strip=True)
-            relative_link = a.get('href', '')
-            log_step(f"Found title: {title} with link: {relative_link}")
+    results = []
 
-            parent = a.find_parent('li', class_='title')
-            if parent:
-                category_elements = parent.select('span.category a.lu-category')
-                categories = [cat.get_text(strip=True) for cat in category_elements if cat.get_text(strip=True)]
-            else:
-                categories = []
+    for a in articles:
+        title = a.get_text(strip=True)
+        relative_link = a.get('href', '')
+        log_step(f"Found title: {title} with link: {relative_link}")
 
-            log_step(f"Categories for title '{title}': {categories}")
+        parent = a.find_parent('li', class_='title')
+        if parent:
+            category_elements = parent.select('span.category a.lu-category')
+            categories = [cat.get_text(strip=True) for cat in category_elements if cat.get_text(strip=True)]
+        else:
+            categories = []
 
-            if title and relative_link:
-                full_link = urljoin(base_url, relative_link)
-                if '#' in full_link:
-                    full_link = full_link.split('#')[0]
+        log_step(f"Categories for title '{title}': {categories}")
 
-                results.append({
-                    'title': title,
-                    'link': full_link,
-                    'categories': categories
-                })
+        if title and relative_link:
+            full_link = urljoin(base_url, relative_link)
+            if '#' in full_link:
+                full_link = full_link.split('#')[0]
 
-        log_step(f"Found {len(results)} posts on {page_url}")
-        return results
+            results.append({
+                'title': title,
+                'link': full_link,
+                'categories': categories
+            })
 
-    except Exception as e:
-        log_step(f"Error fetching {page_url}: {str(e)}")
-        return []
+    log_step(f"Found {len(results)} posts on {page_url}")
+    return results
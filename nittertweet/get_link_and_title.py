@@ -1,11 +1,11 @@
-import requests
 from bs4 import BeautifulSoup
 from log import log_step
+from common.http_client import http_get
 from urllib.parse import urljoin
 
 def get_links_and_titles(page_url, base_url, headers):
     try:
-        response = requests.get(page_url, headers=headers, timeout=10)
+        response = http_get(page_url, headers=headers, timeout=10)
         response.raise_for_status()
 
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -1,19 +1,29 @@
-import time
+import asyncio
+import os
+import sys
+
+# Make the shared common/ package importable when run as `python <site>/main.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from get_link_and_title import get_links_and_titles
-from get_full_content import get_full_content
+from get_full_content import get_full_content_async
 from feed_generation import generate_rss_feed
 from log import log_step
+from common.fetch_engine import iter_full_contents
+from common.feed_writer import stream_feed
+from common.http_client import DEFAULT_HEADERS
+from common.lifecycle import shutdown
+from common.log import bind_log
+from common.media_check import validate_videos, verify_featured_images
+from common.pagination import EarlyStop
+from common.retry_policy import start_run_deadline
 from urllib.parse import urljoin
 
 BASE_URL = "https://nitter.net"
 TARGET_USER = "elonmusk"
 START_URL = f"{BASE_URL}/{TARGET_USER}"
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                  "AppleWebKit/537.36 (KHTML, like Gecko) "
-                  "Chrome/122.0.0.0 Safari/537.36"
-}
+HEADERS = DEFAULT_HEADERS
 
 MAX_PAGES = 5  # Adjust based on how many pages you want to scrape
 
@@ -25,60 +35,81 @@ def extract_next_cursor(soup):
         return more_button["href"]
     return None
 
-def main():
-    all_posts = []
+async def scrape():
+    listed_posts = []
     page_count = 0
     cursor = ""
+    early_stop = EarlyStop(START_URL)
 
     while page_count < MAX_PAGES:
         current_url = START_URL + cursor
         log_step(f"Scraping page {page_count + 1}: {current_url}")
 
-        retry_count = 0
-        while retry_count < 3:
-            posts, soup = get_links_and_titles(current_url, BASE_URL, HEADERS)
-            if soup is None:
-                log_step("Hit rate limit or fetch failed. Retrying...")
-                time.sleep(5 * (retry_count + 1))  # Exponential backoff
-                retry_count += 1
-                continue
-            break
-        else:
+        # http_get already retried throttling and transient errors under
+        # the shared retry policy; a None soup means it gave up.
+        posts, soup = await asyncio.to_thread(get_links_and_titles, current_url, BASE_URL, HEADERS)
+        if soup is None:
             log_step("Failed to retrieve page after multiple retries.")
             break
 
-        for post in posts:
-            try:
-                content, featured_image = get_full_content(post['link'], HEADERS)
-                if not post.get('title') or not post.get('link'):
-                    log_step(f"Skipping invalid post: {post}")
-                    continue
-
-                post['content'] = content
-                post['featured_image'] = featured_image
-                post['categories'] = post.get('categories', [])
-                post['link'] = post['link'].replace('/main/', '/thisthat/').replace('/page/1', '')
-
-                log_step(f"Added content for: {post['title']} (link: {post['link']}, content length: {len(content)}, categories: {post['categories']})")
-                all_posts.append(post)
-
-            except Exception as e:
-                log_step(f"Failed to process post {post.get('title', 'unknown')}: {str(e)}")
-                continue
+        listed_posts.extend(posts)
 
         page_count += 1
+        if early_stop.should_stop(page_count, posts):
+            break
         cursor_path = extract_next_cursor(soup)
         if not cursor_path:
             log_step("No more pages to load.")
             break
         cursor = cursor_path  # e.g., "?cursor=XYZ"
 
-    log_step(f"Total posts collected: {len(all_posts)}")
+    total = await stream_feed(generate_rss_feed, collect_posts(listed_posts))
 
-    if all_posts:
-        generate_rss_feed(all_posts)
-    else:
+    log_step(f"Total posts collected: {total}")
+
+    if not total:
         log_step("No posts to generate RSS feed")
 
+async def collect_posts(listed_posts):
+    # Posts in listing order as their content arrives; stream_feed() hands
+    # each one to the feed writer while later ones are still being fetched.
+    async for post, (content, featured_image, videos) in iter_full_contents(listed_posts, get_full_content_async, HEADERS):
+        try:
+            if not post.get('title') or not post.get('link'):
+                log_step(f"Skipping invalid post: {post}")
+                continue
+
+            # Failed or skipped fetches come back empty and are retried next
+            # run; the rolling feed keeps its previous copy until then.
+            if not content:
+                log_step(f"Skipping post without content: {post['link']}")
+                continue
+            # A copy, so listed_posts never holds the content.
+            post = dict(post, content=content)
+            post['featured_image'] = featured_image
+            post['videos'] = videos
+            post['categories'] = post.get('categories', [])
+            post['link'] = post['link'].replace('/main/', '/thisthat/').replace('/page/1', '')
+
+            log_step(f"Added content for: {post['title']} (link: {post['link']}, content length: {len(content)}, categories: {post['categories']})")
+            await verify_featured_images([post], HEADERS)
+            await validate_videos([post])
+
+        except Exception as e:
+            log_step(f"Failed to process post {post.get('title', 'unknown')}: {str(e)}")
+            continue
+        yield post
+
+async def run():
+    bind_log(log_step)
+    start_run_deadline()
+    try:
+        await scrape()
+    finally:
+        await shutdown()
+
+def main():
+    asyncio.run(run())
+
 if __name__ == "__main__":
     main()
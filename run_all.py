@@ -1,7 +1,22 @@
+import asyncio
+import hashlib
+import importlib.util
 import subprocess
 import os
+import socket
+import sys
+from contextlib import contextmanager
 from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from playwright.sync_api import sync_playwright
+from common.browser_pool import BROWSER_ENDPOINT_ENV
+from common.chromium_procs import owner_args, reap_orphans
+from common.fetch_engine import share_limits
+from common.lifecycle import shutdown, shutdown_held
+from common.state import state_path, load_json, save_json
+
+# sha256 of each site's feed.xml as of the last successful push
+PUBLISHED_FILE = state_path("published_feeds.json")
 
 # List of project folders
 folders = [
@@ -13,11 +28,24 @@ folders = [
      "gorhotdeals",
      "gorannounce",
      "clienft",   
-     "zdnetai"
+     "zdnetai",
      "goridol"
     # "nittertweet"
 ]
 
+# By default every site runs in this process on one asyncio loop, sharing the
+# browser, HTTP sessions, caches and host limiters. RSSFEED_SCHEDULER=process
+# goes back to one interpreter per site; RSSFEED_ISOLATE=a,b keeps only the
+# named folders in their own interpreter (each with a private browser).
+SCHEDULER = os.environ.get("RSSFEED_SCHEDULER", "inprocess").strip().lower()
+ISOLATED_FOLDERS = {folder.strip() for folder in os.environ.get("RSSFEED_ISOLATE", "").split(",") if folder.strip()}
+# Posts rendered at once across all in-process sites, and worker threads for
+# their blocking listing fetches and extraction.
+MAX_SHARED_PAGES = 16
+WORKER_THREADS = 32
+# Modules every site folder defines under the same name.
+SITE_MODULES = ("log", "get_link_and_title", "get_full_content", "feed_generation")
+
 def clear_logs():
     for folder in folders:
         log_file = Path(folder) / "steps.log"
@@ -25,33 +53,169 @@ def clear_logs():
             log_file.unlink()
             print(f"Deleted {log_file}")
 
-def run_script(folder):
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@contextmanager
+def shared_browser():
+    # One Chromium for the whole batch; every site process attaches to it over
+    # CDP and only opens its own contexts, instead of launching a browser each.
+    port = _free_port()
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True, args=[f"--remote-debugging-port={port}", *owner_args()])
+        endpoint = f"http://127.0.0.1:{port}"
+        print(f"Shared Chromium listening on {endpoint}")
+        try:
+            yield endpoint
+        finally:
+            browser.close()
+
+def run_script(folder, browser_endpoint=None):
     main_script = Path(folder) / "main.py"
     if main_script.exists():
         print(f"Running {main_script}")
+        env = dict(os.environ)
+        if browser_endpoint:
+            env[BROWSER_ENDPOINT_ENV] = browser_endpoint
         try:
-            subprocess.run(["python", str(main_script)], check=True)
+            subprocess.run(["python", str(main_script)], check=True, env=env)
             return f"{folder}: Completed"
         except subprocess.CalledProcessError as e:
             return f"{folder}: Failed - {e}"
     else:
         return f"{folder}: main.py not found"
 
-def run_all_main_scripts_concurrently():
+def run_all_main_scripts_concurrently(browser_endpoint=None):
     with ProcessPoolExecutor() as executor:
-        futures = {executor.submit(run_script, folder): folder for folder in folders}
+        futures = {executor.submit(run_script, folder, browser_endpoint): folder for folder in folders}
         for future in as_completed(futures):
             print(future.result())
 
+def _feed_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def changed_feeds():
+    # {folder: hash} for every feed.xml that differs from the last publish.
+    published = load_json(PUBLISHED_FILE, {})
+    changed = {}
+    for folder in folders:
+        feed_file = Path(folder) / "feed.xml"
+        if not feed_file.exists():
+            continue
+        digest = _feed_hash(feed_file)
+        if published.get(folder) != digest:
+            changed[folder] = digest
+    return changed
+
+def load_site(folder):
+    # Imports <folder>/main.py as its own module. The sites' shared module
+    # names are cleared before each import and filed under "<folder>_<name>"
+    # after it; main's from-imports already hold that site's functions.
+    site_dir = str(Path(folder).resolve())
+    for name in SITE_MODULES:
+        sys.modules.pop(name, None)
+    sys.path.insert(0, site_dir)
+    try:
+        spec = importlib.util.spec_from_file_location(f"{folder}_main", os.path.join(site_dir, "main.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(site_dir)
+        for name in SITE_MODULES:
+            loaded = sys.modules.pop(name, None)
+            if loaded is not None:
+                sys.modules[f"{folder}_{name}"] = loaded
+    return module
+
+async def run_site_in_process(folder, site):
+    try:
+        await site.run()
+        return f"{folder}: Completed"
+    except Exception as e:
+        return f"{folder}: Failed - {e}"
+
+async def run_site_isolated(folder):
+    print(f"Running {folder}/main.py in its own process")
+    process = await asyncio.create_subprocess_exec(sys.executable, str(Path(folder) / "main.py"))
+    returncode = await process.wait()
+    if returncode == 0:
+        return f"{folder}: Completed"
+    return f"{folder}: Failed - exit status {returncode}"
+
+async def run_all_sites_in_process():
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=WORKER_THREADS))
+    share_limits(max_concurrency=MAX_SHARED_PAGES)
+    jobs = []
+    # Sites call shutdown() when they finish; the shared pools are closed
+    # once, after the last of them.
+    with shutdown_held():
+        for folder in folders:
+            if not (Path(folder) / "main.py").exists():
+                print(f"{folder}: main.py not found")
+            elif folder in ISOLATED_FOLDERS:
+                jobs.append(run_site_isolated(folder))
+            else:
+                try:
+                    site = load_site(folder)
+                except Exception as e:
+                    print(f"{folder}: Failed to load - {e}")
+                    continue
+                print(f"Running {folder}/main.py in process")
+                jobs.append(run_site_in_process(folder, site))
+        for job in asyncio.as_completed(jobs):
+            print(await job)
+    await shutdown()
+
+def _unpushed(committed):
+    # Whether the branch has commits its upstream lacks, such as one from a
+    # run whose push failed. Without an upstream to compare against, only a
+    # commit made just now counts.
+    result = subprocess.run(["git", "rev-list", "--count", "@{u}..HEAD"], capture_output=True, text=True)
+    if result.returncode != 0:
+        return committed
+    return int(result.stdout.strip() or 0) > 0
+
 def git_commit_and_push():
-    print("Adding files to git...")
-    subprocess.run(["git", "add", "."], check=True)
-    print("Committing...")
-    subprocess.run(["git", "commit", "-m", "Auto update"], check=True)
-    print("Pushing to GitHub...")
-    subprocess.run(["git", "push"], check=True)
+    # published_feeds.json is local and may be missing or stale, so it only
+    # narrows down what to stage; git decides whether there is anything to
+    # commit or push.
+    changed = changed_feeds()
+    committed = False
+    if changed:
+        print(f"Changed feeds: {', '.join(changed)}")
+        paths = [str(Path(folder) / "feed.xml") for folder in changed]
+        print("Adding files to git...")
+        subprocess.run(["git", "add", "--", *paths], check=True)
+        if subprocess.run(["git", "diff", "--cached", "--quiet", "--", *paths]).returncode == 0:
+            print("Feeds match the last commit, nothing to commit")
+        else:
+            print("Committing...")
+            subprocess.run(["git", "commit", "-m", f"Auto update: {', '.join(changed)}"], check=True)
+            committed = True
+    if _unpushed(committed):
+        print("Pushing to GitHub...")
+        subprocess.run(["git", "push"], check=True)
+    elif not changed:
+        print("No feed changed since the last publish, skipping commit and push")
+    # Only recorded once pushed: a failed or interrupted push leaves the old
+    # hashes, so the next run stages, commits or pushes again as needed.
+    if changed:
+        save_json(PUBLISHED_FILE, {**load_json(PUBLISHED_FILE, {}), **changed})
 
 if __name__ == "__main__":
     clear_logs()
-    run_all_main_scripts_concurrently()
+    reap_orphans()
+    if SCHEDULER == "process":
+        with shared_browser() as endpoint:
+            run_all_main_scripts_concurrently(endpoint)
+    else:
+        asyncio.run(run_all_sites_in_process())
+    # Sites that crashed mid-run may have left private browsers behind.
+    reap_orphans()
     git_commit_and_push()
@@ -1,101 +1,113 @@
 from bs4 import BeautifulSoup, Comment
 from log import log_step
-from playwright.sync_api import sync_playwright
-import requests
+from common.content_loader import load_post_content_async
 import time
 
-def get_full_content(post_url, headers):
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(extra_http_headers=headers)
-            page = context.new_page()
-
-            start_time = time.time()
-            page.goto(post_url, timeout=60000, wait_until="domcontentloaded")
-            duration = time.time() - start_time
-            log_step(f"[⏱️] Page loaded in {duration:.2f}s: {post_url}")
+CONTENT_SELECTOR = '.view_cont'
+# digitalcamp ad servers behind the dcamp_ad slots
+BLOCKED_DOMAINS = ['dcamp.kr']
+RENDER_OPTIONS = {
+    'goto_timeout': 60000,
+    'selector_timeout': 10000,
+    'wait_until': 'domcontentloaded',
+    'blocked_domains': BLOCKED_DOMAINS,
+}
 
-            page.wait_for_selector('.view_cont', timeout=10000)
-            html = page.content()
-            browser.close()
+# Same cleanup as extract_content(), run inside the page when
+# RSSFEED_EXTRACTION_MODE=browser.
+BROWSER_EXTRACT = {
+    'asset_host': 'https://edgio.clien.net',
+    'asset_prefix': 'F01',
+    'remove_selectors': [
+        'div.view_ad',
+        'div[id^="dcamp_ad"]',
+        'div.mt_bn_box',
+        'script',
+        'iframe',
+        'div.news_box.connect',
+    ],
+    # browsers have no :contains(), so the "Related Articles" header is
+    # matched by text instead
+    'remove_headings': [['h2', 'Related Articles']],
+}
 
-        soup = BeautifulSoup(html, 'lxml')
-        content_root = soup.find('div', class_='view_cont')
-        if not content_root:
-            log_step(f"[⚠️] No .view_cont found at {post_url}")
-            return '', ''
-                # Remove ads and unrelated blocks
-        ad_selectors = [
-            'div.view_ad',       # top ad
-            'div[id^="dcamp_ad"]',  # digitalcamp ads
-            'div.mt_bn_box',     # bottom ad box
-            'script',            # inline ad scripts
-            'iframe',            # ad iframes
-            'h2:has(span:contains("Related Articles"))',  # "Related Articles" section header
-            'div.news_box.connect'  # Related articles list
-        ]
-        for selector in ad_selectors:
-            for tag in content_root.select(selector):
-                tag.decompose()
+async def get_full_content_async(post_url, headers):
+    try:
+        start_time = time.time()
+        result = await load_post_content_async(post_url, headers, CONTENT_SELECTOR, extract_content, BROWSER_EXTRACT, **RENDER_OPTIONS)
+        duration = time.time() - start_time
+        log_step(f"[⏱️] Page loaded in {duration:.2f}s: {post_url}")
+        return result
+    except Exception as e:
+        log_step(f"[❌] Error fetching content from {post_url}: {str(e)}")
+        return '', '', []
 
-        # Remove HTML comments
-        for comment in content_root.find_all(string=lambda text: isinstance(text, Comment)):
-            comment.extract()
+def extract_content(html, post_url, headers):
+    soup = BeautifulSoup(html, 'lxml')
+    content_root = soup.find('div', class_='view_cont')
+    if not content_root:
+        log_step(f"[⚠️] No .view_cont found at {post_url}")
+        return '', '', []
+            # Remove ads and unrelated blocks
+    ad_selectors = [
+        'div.view_ad',       # top ad
+        'div[id^="dcamp_ad"]',  # digitalcamp ads
+        'div.mt_bn_box',     # bottom ad box
+        'script',            # inline ad scripts
+        'iframe',            # ad iframes
+        'h2:has(span:contains("Related Articles"))',  # "Related Articles" section header
+        'div.news_box.connect'  # Related articles list
+    ]
+    for selector in ad_selectors:
+        for tag in content_root.select(selector):
+            tag.decompose()
 
-        image_urls = []
-        video_urls = []
-        for tag in content_root.find_all(['img', 'video']):
-            if tag.name == 'img':
-                src = tag.get('src', '')
-                if src and not src.startswith('http'):
-                    src = 'https://edgio.clien.net' + src if src.startswith('F01') else 'https://edgio.clien.netF01' + src
-                tag['src'] = src
-                tag['width'] = '720px'
-                image_urls.append(src)
+    # Remove HTML comments
+    for comment in content_root.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
 
-            if tag.name == 'video':
-                src = tag.get('src', '')
-                poster = tag.get('poster', '')
-                if src and not src.startswith('http'):
-                    src = 'https://edgio.clien.net' + src if src.startswith('F01') else 'https://edgio.clien.netF01' + src
-                if poster and not poster.startswith('http'):
-                    poster = 'https://edgio.clien.net' + poster if poster.startswith('F01') else 'https://edgio.clien.netF01' + poster
+    image_urls = []
+    video_urls = []
+    for tag in content_root.find_all(['img', 'video']):
+        if tag.name == 'img':
+            src = tag.get('src', '')
+            if src and not src.startswith('http'):
+                src = 'https://edgio.clien.net' + src if src.startswith('F01') else 'https://edgio.clien.netF01' + src
+            tag['src'] = src
+            tag['width'] = '720px'
+            image_urls.append(src)
 
-                tag['src'] = src
-                tag['poster'] = poster
-                tag['width'] = '720px'
-                if 'controls' not in tag.attrs:
-                    tag['controls'] = ''
-                video_urls.append(src)
+        if tag.name == 'video':
+            src = tag.get('src', '')
+            poster = tag.get('poster', '')
+            if src and not src.startswith('http'):
+                src = 'https://edgio.clien.net' + src if src.startswith('F01') else 'https://edgio.clien.netF01' + src
+            if poster and not poster.startswith('http'):
+                poster = 'https://edgio.clien.net' + poster if poster.startswith('F01') else 'https://edgio.clien.netF01' + poster
 
-        cleaned_html = str(content_root)
+            tag['src'] = src
+            tag['poster'] = poster
+            tag['width'] = '720px'
+            if 'controls' not in tag.attrs:
+                tag['controls'] = ''
+            video_urls.append(src)
 
-        # Verify featured image
-        featured_image = image_urls[0] if image_urls else None
-        if featured_image:
-            try:
-                response = requests.head(featured_image, headers=headers, timeout=5)
-                if response.status_code != 200:
-                    featured_image = None
-            except Exception as e:
-                log_step(f"[⚠️] Failed to verify featured image {featured_image}: {str(e)}")
-                featured_image = None
+    cleaned_html = str(content_root)
 
-        log_step(
-            f"==============\n"
-            f"[📰] Title: {soup.title.text.strip() if soup.title else 'N/A'}\n"
-            f"[🔗] Link: {post_url}\n"
-            f"[📄] Content: {cleaned_html[:500]}{'...' if len(cleaned_html) > 500 else ''}\n"
-            f"[🔢] Length: {len(cleaned_html)} chars\n"
-            f"[🖼️] Featured Image: {featured_image}\n"
-            f"[🖼️] Image URLs: {image_urls}\n"
-            f"[🎞️] Video URLs: {video_urls}\n"
-            f"=============="
-        )
+    # Pick featured image; verify_featured_images() checks it later, for
+    # all posts at once
+    featured_image = image_urls[0] if image_urls else None
 
-        return cleaned_html, featured_image
+    log_step(
+        f"==============\n"
+        f"[📰] Title: {soup.title.text.strip() if soup.title else 'N/A'}\n"
+        f"[🔗] Link: {post_url}\n"
+        f"[📄] Content: {cleaned_html[:500]}{'...' if len(cleaned_html) > 500 else ''}\n"
+        f"[🔢] Length: {len(cleaned_html)} chars\n"
+        f"[🖼️] Featured Image: {featured_image}\n"
+        f"[🖼️] Image URLs: {image_urls}\n"
+        f"[🎞️] Video URLs: {video_urls}\n"
+        f"=============="
+    )
 
-    except Exception as e:
-        log_step(f"[❌] Error fetching content from {post_url}: {str(e)}")
-        return '', ''
+    return cleaned_html, featured_image, video_urls
@@ -1,48 +1,47 @@
-import requests
 from bs4 import BeautifulSoup
 from log import log_step
+from common.listing_cache import fetch_listing
 from urllib.parse import urljoin
 
 def get_links_and_titles(page_url, base_url, headers, verify=False):
     try:
-        response = requests.get(page_url, headers=headers, timeout=10, verify=verify)
-        response.raise_for_status()
-
-        log_step(f"Raw HTML content for {page_url}: {response.text[:500]}...")
+        return fetch_listing(page_url, headers, lambda html: parse_links_and_titles(html, page_url, base_url), verify=verify)
+    except Exception as e:
+        log_step(f"Error fetching {page_url}: {str(e)}")
+        return []
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        posts = soup.select('div.newsPost')
-        log_step(f"Found {len(posts)} .newsPost blocks on the page")
+def parse_links_and_titles(html, page_url, base_url):
+    log_step(f"Raw HTML content for {page_url}: {html[:500]}...")
 
-        results = []
+    soup = BeautifulSoup(html, 'html.parser')
+    posts = soup.select('div.newsPost')
+    log_step(f"Found {len(posts)} .newsPost blocks on the page")
 
-        for post in posts:
-            thumb_link_tag = post.select_one('div.assetThumb > a')
-            text_link_tag = post.select_one('div.assetText > a')
-            title_tag = text_link_tag.select_one('h3') if text_link_tag else None
+    results = []
 
-            if not thumb_link_tag or not title_tag:
-                log_step("Skipping one post due to missing thumbnail <a> or <h3> tag")
-                continue
+    for post in posts:
+        thumb_link_tag = post.select_one('div.assetThumb > a')
+        text_link_tag = post.select_one('div.assetText > a')
+        title_tag = text_link_tag.select_one('h3') if text_link_tag else None
 
-            relative_link = thumb_link_tag.get('href', '') or text_link_tag.get('href', '')
-            title = title_tag.get_text(strip=True)
+        if not thumb_link_tag or not title_tag:
+            log_step("Skipping one post due to missing thumbnail <a> or <h3> tag")
+            continue
 
-            log_step(f"Found title: {title} with link: {relative_link}")
+        relative_link = thumb_link_tag.get('href', '') or text_link_tag.get('href', '')
+        title = title_tag.get_text(strip=True)
 
-            full_link = urljoin(base_url, relative_link)
-            if '#' in full_link:
-                full_link = full_link.split('#')[0]
+        log_step(f"Found title: {title} with link: {relative_link}")
 
-            results.append({
-                'title': title,
-                'link': full_link,
-                'categories': []
-            })
+        full_link = urljoin(base_url, relative_link)
+        if '#' in full_link:
+            full_link = full_link.split('#')[0]
 
-        log_step(f"Found {len(results)} valid posts on {page_url}")
-        return results
+        results.append({
+            'title': title,
+            'link': full_link,
+            'categories': []
+        })
 
-    except Exception as e:
-        log_step(f"Error fetching {page_url}: {str(e)}")
-        return []
+    log_step(f"Found {len(results)} valid posts on {page_url}")
+    return results